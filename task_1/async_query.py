@@ -0,0 +1,311 @@
+import asyncio
+import functools
+import io
+import time
+
+from psycopg import errors
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool
+
+import db
+from query import (
+    ADD_TASK_SQL,
+    DELETE_TASK_SQL,
+    INCOMPLETE_TASKS_SQL,
+    MOVED_ROW_ATTEMPTS,
+    PREPARED_STATEMENTS,
+    TASK_COUNT_BY_STATUS_SQL,
+    TASKS_BY_STATUS_SQL,
+    TASKS_BY_USER_SQL,
+    TASKS_FOR_EMAIL_DOMAIN_SQL,
+    TASKS_WITHOUT_DESCRIPTION_SQL,
+    UPDATE_TASK_STATUS_SQL,
+    UPDATE_USER_FULLNAME_SQL,
+    USER_BY_TASK_ID_SQL,
+    USERS_AND_TASK_COUNT_SQL,
+    USERS_BY_DOMAIN_SQL,
+    USERS_WITH_TASKS_IN_PROGRESS_SQL,
+    USERS_WITHOUT_TASKS_SQL,
+    invalidate_task_reads,
+    invalidate_user_reads,
+    normalize_domain,
+    route_email_pattern,
+    with_completed_id,
+)
+from statuses import status_id as cached_status_id
+
+_pool = None
+
+
+async def get_async_pool():
+    """Return the async connection pool, opening it on first use.
+
+    It is sized by the same POSTGRES_POOL_* settings as the sync pool in db.py.
+    """
+    global _pool
+    if _pool is None:
+        pool = AsyncConnectionPool(
+            make_conninfo(
+                host=db.db_host, dbname=db.db_name, user=db.db_user, password=db.db_password
+            ),
+            min_size=db.pool_min,
+            max_size=db.pool_max,
+            max_idle=db.pool_idle_timeout,
+            timeout=db.pool_checkout_timeout,
+            open=False,
+        )
+        await pool.open()
+        _pool = pool
+    return _pool
+
+
+async def close_async_pool():
+    """Close the async connection pool if it was opened."""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+async def status_id(name):
+    """Resolve a status name through the shared status cache without blocking the loop."""
+    return await asyncio.to_thread(cached_status_id, name)
+
+
+async def _fetchone(sql, params=None):
+    # pool.connection() commits when the block exits without an error
+    pool = await get_async_pool()
+    async with pool.connection() as conn:
+        cur = await conn.execute(sql, params)
+        return await cur.fetchone()
+
+
+async def _fetchall(sql, params=None):
+    pool = await get_async_pool()
+    async with pool.connection() as conn:
+        cur = await conn.execute(sql, params)
+        return await cur.fetchall()
+
+
+async def _execute(sql, params=None):
+    pool = await get_async_pool()
+    async with pool.connection() as conn:
+        await conn.execute(sql, params)
+
+
+def retry_moved_rows(func):
+    """Async counterpart of query.retry_moved_rows for writes of partitioned tasks rows."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        for attempt in range(1, MOVED_ROW_ATTEMPTS + 1):
+            try:
+                return await func(*args, **kwargs)
+            except errors.SerializationFailure:
+                if attempt == MOVED_ROW_ATTEMPTS:
+                    raise
+    return wrapper
+
+
+async def get_user_by_task_id(task_id):
+    """Retrieve the user assigned to a specific task."""
+    return await _fetchone(USER_BY_TASK_ID_SQL, (task_id,))
+
+
+async def get_tasks_by_user(user_id):
+    """Retrieve all tasks assigned to a specific user."""
+    return await _fetchall(TASKS_BY_USER_SQL, (user_id,))
+
+
+async def get_tasks_by_status(status_name):
+    """Retrieve all tasks with a specific status."""
+    return await _fetchall(TASKS_BY_STATUS_SQL, (await status_id(status_name),))
+
+
+@retry_moved_rows
+async def update_task_status(task_id, new_status_name):
+    """Update the status of a specific task."""
+    updated = await _fetchone(UPDATE_TASK_STATUS_SQL, (await status_id(new_status_name), task_id))
+    if updated:
+        invalidate_task_reads([updated[0]], task_count_changed=False)
+
+
+async def get_users_without_tasks():
+    """Retrieve all users who do not have any tasks assigned."""
+    return await _fetchall(USERS_WITHOUT_TASKS_SQL)
+
+
+async def add_new_task_for_user(title, description, status_name, user_id):
+    """Add a new task for a specific user."""
+    await _execute(ADD_TASK_SQL, (title, description, await status_id(status_name), user_id))
+    invalidate_task_reads([user_id])
+
+
+async def get_incomplete_tasks():
+    """Retrieve all tasks that are not marked as completed."""
+    # psycopg 3 prepares a statement after a few executions, so the id is inlined as in query.py
+    return await _fetchall(with_completed_id(INCOMPLETE_TASKS_SQL, await status_id("completed")))
+
+
+@retry_moved_rows
+async def delete_task_by_id(task_id):
+    """Delete a specific task by its ID."""
+    deleted = await _fetchone(DELETE_TASK_SQL, (task_id,))
+    if deleted:
+        invalidate_task_reads([deleted[0]])
+
+
+async def find_users_by_email_pattern(email_pattern):
+    """Find users whose email matches a specific pattern."""
+    name, params = route_email_pattern(email_pattern)
+    return await _fetchall(PREPARED_STATEMENTS[name], params)
+
+
+async def get_users_by_domain(domain):
+    """Retrieve users whose email domain is `domain`, case-insensitively."""
+    return await _fetchall(USERS_BY_DOMAIN_SQL, (normalize_domain(domain),))
+
+
+async def update_user_fullname(user_id, new_fullname):
+    """Update the fullname of a specific user."""
+    await _execute(UPDATE_USER_FULLNAME_SQL, (new_fullname, user_id))
+    invalidate_user_reads()
+
+
+async def get_task_count_by_status():
+    """Retrieve the count of tasks for each status."""
+    return await _fetchall(TASK_COUNT_BY_STATUS_SQL)
+
+
+async def get_tasks_for_users_with_email_domain(domain):
+    """Retrieve tasks assigned to users with a specific email domain."""
+    return await _fetchall(TASKS_FOR_EMAIL_DOMAIN_SQL, (normalize_domain(domain),))
+
+
+async def get_tasks_without_description():
+    """Retrieve all tasks that do not have a description."""
+    return await _fetchall(TASKS_WITHOUT_DESCRIPTION_SQL)
+
+
+async def get_users_with_tasks_in_progress():
+    """Retrieve users and their tasks that are marked as 'in progress'."""
+    return await _fetchall(USERS_WITH_TASKS_IN_PROGRESS_SQL, (await status_id("in progress"),))
+
+
+async def get_users_and_task_count():
+    """Retrieve users and the count of their tasks."""
+    return await _fetchall(USERS_AND_TASK_COUNT_SQL)
+
+
+async def run_concurrently(*awaitables):
+    """Run independent queries concurrently and return their results in order."""
+    return await asyncio.gather(*awaitables)
+
+
+TASK_COLUMNS = ["Task ID", "Title", "Description", "Status"]
+USER_COLUMNS = ["User ID", "Fullname", "Email"]
+
+
+async def main():
+    """Async version of query.main() with the same steps in the same order.
+
+    Each write runs alone, and the reads between two writes run concurrently,
+    so every step sees the same data as in the sync report. Returns the report
+    text and the wall-clock time.
+    """
+    import pandas as pd
+
+    started = time.perf_counter()
+    buffer = io.StringIO()
+
+    user_tasks, new_tasks = await run_concurrently(get_tasks_by_user(1), get_tasks_by_status("new"))
+
+    buffer.write("1. Отримуємо всі завдання для конкретного користувача:")
+    buffer.write(f"{pd.DataFrame(user_tasks, columns=TASK_COLUMNS)}\n\n")
+
+    buffer.write("\n2. Вибираємо всі завдання з конкретним статусом 'new':")
+    buffer.write(f"{pd.DataFrame(new_tasks, columns=TASK_COLUMNS)}\n\n")
+
+    buffer.write("\n3. Оновлюємо статус конкретного завдання:")
+    if new_tasks:
+        task_id_to_update = new_tasks[0][0]
+        buffer.write(f"\nОновлюємо статус завдання із ID {task_id_to_update} в 'in progress'\n\n")
+        await update_task_status(task_id_to_update, "in progress")
+
+    buffer.write("\n4. Вибираємо всіх користувачів, які не мають жодного завдання:")
+    users_without_tasks = await get_users_without_tasks()
+    buffer.write(f"{pd.DataFrame(users_without_tasks, columns=USER_COLUMNS)}\n\n")
+
+    buffer.write("\n5. Додаємо нове завдання для користувача:")
+    if users_without_tasks:
+        user_id = users_without_tasks[0][0]
+        await add_new_task_for_user("Another Task", "", "in progress", user_id)
+        new_user_tasks, incomplete_tasks = await run_concurrently(
+            get_tasks_by_user(user_id), get_incomplete_tasks()
+        )
+        buffer.write("\nЗавдання користувача після додавання нового:")
+        buffer.write(f"{pd.DataFrame(new_user_tasks, columns=TASK_COLUMNS)}\n\n")
+    else:
+        incomplete_tasks = await get_incomplete_tasks()
+
+    buffer.write("\n6. Вибираємо всі завдання, які ще не завершено:")
+    buffer.write(f"{pd.DataFrame(incomplete_tasks, columns=TASK_COLUMNS)}\n\n")
+
+    buffer.write("\n7. Видаляємо конкретне завдання за його id:")
+    if incomplete_tasks:
+        task_id_to_delete = incomplete_tasks[0][0]
+        user_id = (await get_user_by_task_id(task_id_to_delete))[0]
+        buffer.write(f"\nВидалення завдання із ID {task_id_to_delete}")
+        await delete_task_by_id(task_id_to_delete)
+        remaining_tasks, users_by_email = await run_concurrently(
+            get_tasks_by_user(user_id), find_users_by_email_pattern("%@example.com%")
+        )
+        buffer.write("\nЗавдання користувача після видалення:")
+        buffer.write(f"{pd.DataFrame(remaining_tasks, columns=TASK_COLUMNS)}\n\n")
+    else:
+        users_by_email = await find_users_by_email_pattern("%@example.com%")
+
+    buffer.write("\n8. Знаходимо користувачів за електронною поштою з умовою LIKE:")
+    buffer.write(f"{pd.DataFrame(users_by_email, columns=USER_COLUMNS)}\n\n")
+
+    buffer.write("\n9. Оновлюємо ім'я користувача:")
+    await update_user_fullname(1, "John Doe")
+    buffer.write("\nUser 1's name updated to 'John Doe'.")
+
+    (
+        count_by_status, tasks_with_domain, tasks_without_description,
+        users_in_progress, users_task_count,
+    ) = await run_concurrently(
+        get_task_count_by_status(),
+        get_tasks_for_users_with_email_domain("@example.com"),
+        get_tasks_without_description(),
+        get_users_with_tasks_in_progress(),
+        get_users_and_task_count(),
+    )
+
+    buffer.write("\n10. Отримуємо кількість завдань для кожного статусу:")
+    buffer.write(f"{pd.DataFrame(count_by_status, columns=['Status', 'Task Count'])}\n\n")
+
+    buffer.write(
+        "\n11. Вибираємо завдання, призначені користувачам, чия електронна пошта містить '@example.com':"
+    )
+    buffer.write(f"{pd.DataFrame(tasks_with_domain, columns=['Task ID', 'Title', 'Description', 'Fullname', 'Email', 'Status'])}\n\n")
+
+    buffer.write("\n12. Вибираємо завдання, у яких відсутній опис:")
+    buffer.write(f"{pd.DataFrame(tasks_without_description, columns=['Task ID', 'Title', 'User ID', 'Status ID'])}\n\n")
+
+    buffer.write(
+        "\n13. Вибираємо користувачів та їхні завдання, які знаходяться у статусі 'in progress':"
+    )
+    buffer.write(f"{pd.DataFrame(users_in_progress, columns=['User ID', 'Fullname', 'Task ID', 'Title', 'Description', 'Status'])}\n\n")
+
+    buffer.write("\n14. Отримуємо користувачів та кількість їхніх завдань:")
+    buffer.write(f"{pd.DataFrame(users_task_count, columns=['User ID', 'Fullname', 'Email', 'Task Count'])}\n\n")
+
+    return buffer.getvalue(), time.perf_counter() - started
+
+
+async def run_main():
+    try:
+        return await main()
+    finally:
+        await close_async_pool()
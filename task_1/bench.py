@@ -0,0 +1,354 @@
+import argparse
+import copy
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import query
+from bench_utils import measure, percentile
+from cache import read_cache
+from db import connection
+from drop import drop_tables
+from init import init_database, tasks_partition_by
+from seed_parallel import seed_parallel
+
+# (users, tasks) per dataset scale
+SCALES = {
+    "10k": (1_000, 10_000),
+    "1m": (100_000, 1_000_000),
+    "10m": (1_000_000, 10_000_000),
+    "50m-users": (50_000_000, 10_000_000),
+}
+
+# Title of every task the benchmark creates, so that they can be removed afterwards
+BENCH_TITLE = "bench task"
+
+STATUS_NAMES = ("new", "in progress", "completed")
+
+
+class Dataset:
+    """Id ranges of the seeded data, used to draw arguments for the query functions."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self._lock = threading.Lock()
+        self._spare_task_ids = []
+        with connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT min(id), max(id), count(*) FROM users;")
+                *self.users, self.user_count = cur.fetchone()
+                cur.execute("SELECT min(id), max(id), count(*) FROM tasks;")
+                *self.tasks, self.task_count = cur.fetchone()
+                # Domains of the first users stand in for the ones the service looks up
+                cur.execute("""
+                    SELECT DISTINCT email_domain
+                    FROM (SELECT email_domain FROM users ORDER BY id LIMIT 10000) AS sample;
+                """)
+                self.domains = [row[0] for row in cur.fetchall()]
+        if not self.user_count or not self.task_count:
+            raise RuntimeError("the database is empty; run without --no-setup first")
+
+    def for_client(self, rng):
+        """Share the id ranges and spare tasks with a client's own random generator."""
+        clone = copy.copy(self)
+        clone.rng = rng
+        return clone
+
+    def user_id(self):
+        return self.rng.randint(*self.users)
+
+    def task_id(self):
+        return self.rng.randint(*self.tasks)
+
+    def status(self):
+        return self.rng.choice(STATUS_NAMES)
+
+    def domain(self):
+        return self.rng.choice(self.domains)
+
+    def add_spare_tasks(self, count):
+        """Create tasks for delete_task_by_id to consume, outside of any timing."""
+        ids = query.add_new_tasks(
+            [(BENCH_TITLE, "", self.status(), self.user_id()) for _ in range(count)]
+        )
+        with self._lock:
+            self._spare_task_ids.extend(ids)
+
+    def spare_task_id(self):
+        with self._lock:
+            if not self._spare_task_ids:
+                # Only the mixed workload can run dry; the refill lands in one sample
+                self._spare_task_ids.extend(query.add_new_tasks(
+                    [(BENCH_TITLE, "", "new", self.user_id()) for _ in range(1000)]
+                ))
+            return self._spare_task_ids.pop()
+
+
+def remove_bench_tasks():
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM tasks WHERE title = %s;", (BENCH_TITLE,))
+            return cur.rowcount
+
+
+# Every query function of query.py with a way to draw its arguments
+CASES = {
+    "get_user_by_task_id": lambda d: query.get_user_by_task_id(d.task_id()),
+    "get_tasks_by_user": lambda d: query.get_tasks_by_user(d.user_id()),
+    "get_tasks_by_status": lambda d: query.get_tasks_by_status(d.status()),
+    "update_task_status": lambda d: query.update_task_status(d.task_id(), d.status()),
+    "get_users_without_tasks": lambda d: query.get_users_without_tasks(),
+    "add_new_task_for_user": lambda d: query.add_new_task_for_user(
+        BENCH_TITLE, "", d.status(), d.user_id()
+    ),
+    "get_incomplete_tasks": lambda d: query.get_incomplete_tasks(),
+    "delete_task_by_id": lambda d: query.delete_task_by_id(d.spare_task_id()),
+    "find_users_by_email_pattern": lambda d: query.find_users_by_email_pattern(f"%@{d.domain()}"),
+    "get_users_by_domain": lambda d: query.get_users_by_domain(d.domain()),
+    "update_user_fullname": lambda d: query.update_user_fullname(
+        d.user_id(), f"Bench User {d.rng.randrange(1_000_000)}"
+    ),
+    "get_task_count_by_status": lambda d: query.get_task_count_by_status(),
+    "get_tasks_for_users_with_email_domain": lambda d: query.get_tasks_for_users_with_email_domain(
+        d.domain()
+    ),
+    "get_tasks_without_description": lambda d: query.get_tasks_without_description(),
+    "get_users_with_tasks_in_progress": lambda d: query.get_users_with_tasks_in_progress(),
+    "get_users_and_task_count": lambda d: query.get_users_and_task_count(),
+    "get_tasks_by_status_page": lambda d: query.get_tasks_by_status_page(
+        d.status(), after_id=d.task_id()
+    ),
+    "get_users_and_task_count_page": lambda d: query.get_users_and_task_count_page(
+        after_id=d.user_id()
+    ),
+    "get_users_by_domain_page": lambda d: query.get_users_by_domain_page(d.domain()),
+}
+
+# Relative weights of the operations in the concurrent mixed workload: the
+# service reads single rows and pages, and writes one task at a time
+MIXED_WORKLOAD = {
+    "get_user_by_task_id": 25,
+    "get_tasks_by_user": 25,
+    "get_tasks_by_status_page": 10,
+    "get_users_and_task_count_page": 5,
+    "get_users_by_domain_page": 5,
+    "get_task_count_by_status": 10,
+    "update_task_status": 12,
+    "add_new_task_for_user": 5,
+    "delete_task_by_id": 5,
+    "update_user_fullname": 3,
+}
+
+
+def summarize(samples, elapsed):
+    """Latency percentiles in ms and throughput in calls per second."""
+    return {
+        "calls": len(samples),
+        "throughput": len(samples) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(samples, 50),
+        "p95_ms": percentile(samples, 95),
+        "p99_ms": percentile(samples, 99),
+        "mean_ms": statistics.fmean(samples),
+    }
+
+
+def measure_case(case, dataset, repetitions, warmup):
+    samples = measure(case, (dataset,), repetitions, warmup)
+    return summarize(samples, sum(samples) / 1000)
+
+
+def run_functions(dataset, names, repetitions, warmup):
+    """Time every query function in turn."""
+    if "delete_task_by_id" in names:
+        dataset.add_spare_tasks(repetitions + warmup)
+    results = {}
+    print(f"{repetitions} calls per function, {warmup} warmup calls")
+    print(f"{'function':<40}{'calls/s':>10}{'p50, ms':>10}{'p95, ms':>10}{'p99, ms':>10}")
+    for name in names:
+        result = results[name] = measure_case(CASES[name], dataset, repetitions, warmup)
+        print(f"{name:<40}{result['throughput']:>10.1f}{result['p50_ms']:>10.3f}"
+              f"{result['p95_ms']:>10.3f}{result['p99_ms']:>10.3f}", flush=True)
+    return results
+
+
+def run_mixed(dataset, clients, duration, seed):
+    """Run MIXED_WORKLOAD from `clients` threads for `duration` seconds."""
+    names = list(MIXED_WORKLOAD)
+    weights = list(MIXED_WORKLOAD.values())
+    samples = {name: [] for name in names}
+    errors = []
+    deadline = time.perf_counter() + duration
+
+    def client(index):
+        rng = random.Random(f"{seed}:{index}")
+        local = dataset.for_client(rng)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                CASES[name](local)
+            except Exception as err:  # counted and reported, the client keeps going
+                errors.append((name, repr(err)))
+                continue
+            # list.append is atomic, so clients can share the sample lists
+            samples[name].append((time.perf_counter() - started) * 1000)
+
+    print(f"Mixed workload: {clients} clients for {duration:.0f}s")
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    operations = {name: summarize(s, elapsed) for name, s in samples.items() if s}
+    total = sum(len(s) for s in samples.values())
+    print(f"{'operation':<40}{'calls/s':>10}{'p50, ms':>10}{'p95, ms':>10}{'p99, ms':>10}")
+    for name, result in operations.items():
+        print(f"{name:<40}{result['throughput']:>10.1f}{result['p50_ms']:>10.3f}"
+              f"{result['p95_ms']:>10.3f}{result['p99_ms']:>10.3f}")
+    print(f"total: {total / elapsed:,.1f} operations/s, {len(errors)} errors")
+    return {
+        "clients": clients,
+        "duration": elapsed,
+        "throughput": total / elapsed,
+        "errors": len(errors),
+        "operations": operations,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def server_version():
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SHOW server_version;")
+            return cur.fetchone()[0]
+
+
+def setup(scale, seed, workers, partition_by=tasks_partition_by):
+    """Recreate the schema, partitioned as init.py is configured, and seed it at the given scale."""
+    num_users, num_tasks = SCALES[scale]
+    drop_tables()
+    init_database(partition_by)
+    seed_parallel(num_users, num_tasks, workers=workers, seed=seed)
+    with connection() as conn:
+        with conn.cursor() as cur:
+            # Fresh statistics, so that plans do not depend on autovacuum timing.
+            # ANALYZE may run in a transaction, so the pooled connection keeps its mode
+            cur.execute("ANALYZE;")
+
+
+def compare(results, baseline, threshold):
+    """Return the regressions of `results` against `baseline`.
+
+    A function regresses when its p50 or p95 grows by more than `threshold`
+    (a fraction) and by at least 0.05 ms, which keeps sub-millisecond noise
+    out; the mixed workload regresses when its throughput drops by more than
+    `threshold`.
+    """
+    regressions = []
+    if baseline["meta"].get("scale") != results["meta"].get("scale"):
+        print(f"warning: comparing scale {results['meta'].get('scale')} "
+              f"with baseline scale {baseline['meta'].get('scale')}")
+    for name, new in results.get("functions", {}).items():
+        old = baseline.get("functions", {}).get(name)
+        if old is None:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            if new[metric] > old[metric] * (1 + threshold) and new[metric] - old[metric] >= 0.05:
+                regressions.append(f"{name} {metric}: {old[metric]:.3f} -> {new[metric]:.3f}")
+    new_mixed, old_mixed = results.get("mixed"), baseline.get("mixed")
+    if new_mixed and old_mixed and new_mixed["throughput"] < old_mixed["throughput"] * (1 - threshold):
+        regressions.append(
+            f"mixed throughput: {old_mixed['throughput']:.1f} -> {new_mixed['throughput']:.1f} ops/s"
+        )
+    return regressions
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    if args.setup:
+        setup(args.scale, args.seed, args.workers)
+    # Cached reads would measure the cache, not the queries
+    read_cache.enabled = args.cache
+    dataset = Dataset(rng)
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "scale": args.scale,
+            "users": dataset.user_count,
+            "tasks": dataset.task_count,
+            "repetitions": args.repetitions,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "cache": args.cache,
+            "python": platform.python_version(),
+            "server_version": server_version(),
+        },
+    }
+    try:
+        names = args.only or [name for name in CASES if name not in args.skip]
+        if names and args.repetitions:
+            results["functions"] = run_functions(dataset, names, args.repetitions, args.warmup)
+        if args.mixed:
+            results["mixed"] = run_mixed(dataset, args.clients, args.duration, args.seed)
+    finally:
+        print(f"Removed {remove_bench_tasks()} tasks created by the benchmark")
+
+    output = args.output or f"bench-{args.scale}-{results['meta']['commit']}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        print(f"{len(regressions)} regressions above {args.threshold:.0%} vs {args.compare}")
+        return 1 if regressions else 0
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the query.py functions at a data scale")
+    parser.add_argument("--scale", choices=list(SCALES), default="10k")
+    parser.add_argument("--no-setup", dest="setup", action="store_false",
+                        help="reuse the current database instead of recreating and seeding it")
+    parser.add_argument("--seed", type=int, default=0, help="same seed, same dataset and arguments")
+    parser.add_argument("--workers", type=int, default=None, help="seeding processes")
+    parser.add_argument("--repetitions", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--only", nargs="+", choices=list(CASES), default=None)
+    parser.add_argument("--skip", nargs="+", choices=list(CASES), default=[])
+    parser.add_argument("--cache", action="store_true", help="keep the read cache enabled")
+    parser.add_argument("--mixed", action="store_true", help="also run the concurrent mixed workload")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="mixed workload seconds")
+    parser.add_argument("--output", help="results JSON, by default bench-<scale>-<commit>.json")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed slowdown as a fraction, e.g. 0.10 for 10%%")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(run(parse_args()))
@@ -0,0 +1,80 @@
+import argparse
+import time
+
+import query
+from db import connection
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def first_user_id():
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT min(id) FROM users;")
+            user_id = cur.fetchone()[0]
+    if user_id is None:
+        raise SystemExit("Run init.py and seed.py first")
+    return user_id
+
+
+def looped_add(tasks):
+    return [query.add_new_task_for_user(*task) for task in tasks]
+
+
+def looped_update(task_ids, status_name):
+    for task_id in task_ids:
+        query.update_task_status(task_id, status_name)
+
+
+def looped_delete(task_ids):
+    for task_id in task_ids:
+        query.delete_task_by_id(task_id)
+
+
+def run(rows, chunk_size):
+    """Compare looped single-row writes with the batch functions on `rows` tasks."""
+    user_id = first_user_id()
+    tasks = [(f"Benchmark task {n}", "", "new", user_id) for n in range(rows)]
+
+    # add_new_task_for_user does not return ids, so collect the looped rows by title
+    _, add_single = timed(looped_add, tasks)
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT id FROM tasks WHERE user_id = %s AND title LIKE 'Benchmark task %%';",
+                (user_id,),
+            )
+            single_ids = [row[0] for row in cur.fetchall()]
+    _, update_single = timed(looped_update, single_ids, "in progress")
+    _, delete_single = timed(looped_delete, single_ids)
+
+    batch_ids, add_batch = timed(query.add_new_tasks, tasks, chunk_size)
+    _, update_batch = timed(
+        query.update_task_statuses, [(task_id, "in progress") for task_id in batch_ids], chunk_size
+    )
+    _, delete_batch = timed(query.delete_tasks_by_ids, batch_ids, chunk_size)
+
+    print(f"{rows} rows, chunk size {chunk_size}")
+    print(f"{'operation':<10}{'single, s':>12}{'batch, s':>12}{'speedup':>10}")
+    for name, single, batch in (
+        ("insert", add_single, add_batch),
+        ("update", update_single, update_batch),
+        ("delete", delete_single, delete_batch),
+    ):
+        print(f"{name:<10}{single:>12.3f}{batch:>12.3f}{single / batch:>9.1f}x")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Looped single-row writes vs batch writes")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--chunk-size", type=int, default=query.DEFAULT_CHUNK_SIZE)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.rows, args.chunk_size)
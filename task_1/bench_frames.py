@@ -0,0 +1,83 @@
+import argparse
+import multiprocessing
+import sys
+import time
+
+import pandas as pd
+
+import frames
+import query
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (Unix only)."""
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_tuples(name, args, chunk_rows):
+    rows = getattr(query, name)(*args)
+    return len(pd.DataFrame(rows))
+
+
+def run_copy(name, args, chunk_rows):
+    return len(frames.query_frame(name, *args))
+
+
+def run_copy_chunks(name, args, chunk_rows):
+    sql, build_params = frames.FRAME_QUERIES[name]
+    return sum(len(chunk) for chunk in frames.iter_frames(sql, build_params(*args), chunk_rows))
+
+
+def run_cursor_chunks(name, args, chunk_rows):
+    sql, build_params = frames.FRAME_QUERIES[name]
+    return sum(
+        len(chunk) for chunk in frames.iter_frames_cursor(sql, build_params(*args), chunk_rows)
+    )
+
+
+MODES = {
+    "tuples": run_tuples,
+    "copy": run_copy,
+    "copy-chunks": run_copy_chunks,
+    "cursor-chunks": run_cursor_chunks,
+}
+
+
+def measure(mode, name, args, chunk_rows, results):
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    rows = MODES[mode](name, args, chunk_rows)
+    results.put((mode, rows, time.perf_counter() - started, peak_rss_mb() - baseline))
+
+
+def run(name, args, chunk_rows):
+    """Run every fetch mode in a fresh process so that peak RSS is comparable."""
+    results = multiprocessing.Queue()
+    print(f"{name}{tuple(args)}, chunk size {chunk_rows}")
+    print(f"{'mode':<15}{'rows':>12}{'time, s':>10}{'peak RSS, MB':>15}")
+    for mode in MODES:
+        process = multiprocessing.Process(
+            target=measure, args=(mode, name, args, chunk_rows, results)
+        )
+        process.start()
+        mode, rows, elapsed, rss = results.get()
+        process.join()
+        print(f"{mode:<15}{rows:>12}{elapsed:>10.3f}{rss:>15.1f}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Tuple vs COPY DataFrame fetch: time and peak RSS")
+    parser.add_argument("query", nargs="?", default="get_incomplete_tasks",
+                        choices=sorted(frames.FRAME_QUERIES))
+    parser.add_argument("args", nargs="*", help="query arguments, e.g. a status name")
+    parser.add_argument("--chunk-rows", type=int, default=frames.DEFAULT_CHUNK_ROWS)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.query, [int(arg) if arg.isdigit() else arg for arg in args.args], args.chunk_rows)
@@ -0,0 +1,38 @@
+import argparse
+import statistics
+
+import instrument
+import query
+from bench_utils import measure, percentile
+
+
+def run(calls, warmup, task_id):
+    """Measure the per-call cost of InstrumentedCursor on the cheapest lookup."""
+    print(f"{calls} calls per case, {warmup} warmup calls")
+    print(f"{'mode':<14}{'p50, ms':>10}{'p99, ms':>10}{'mean, ms':>10}")
+    means = {}
+    # Alternate the modes so that drift in server load affects both equally
+    for enabled in (False, True, False, True):
+        instrument.instrument_enabled = enabled
+        samples = measure(query.get_user_by_task_id, (task_id,), calls, warmup)
+        mode = "instrumented" if enabled else "plain"
+        means.setdefault(mode, []).append(statistics.fmean(samples))
+        print(f"{mode:<14}{percentile(samples, 50):>10.3f}"
+              f"{percentile(samples, 99):>10.3f}{statistics.fmean(samples):>10.3f}")
+    instrument.instrument_enabled = True
+    plain = min(means["plain"])
+    overhead = min(means["instrumented"]) - plain
+    print(f"overhead per call: {overhead * 1000:.1f} µs ({overhead / plain * 100:+.1f}%)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Query instrumentation overhead")
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--task-id", type=int, default=1)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.calls, args.warmup, args.task_id)
@@ -0,0 +1,101 @@
+import argparse
+
+import query
+from bench import SCALES, setup
+from bench_utils import measure_plan, plan_lines
+from db import connection
+from init import PARTITION_STRATEGIES, partition_tasks, tasks_hash_partitions
+from statuses import status_id
+
+# Status-filtered statements of query.py that partition pruning should narrow
+STATUS_QUERIES = [
+    ("get_tasks_by_status", query.TASKS_BY_STATUS_SQL, lambda: (status_id("new"),)),
+    ("get_incomplete_tasks", query.INCOMPLETE_TASKS_SQL, lambda: (status_id("completed"),)),
+    ("get_users_with_tasks_in_progress", query.USERS_WITH_TASKS_IN_PROGRESS_SQL,
+     lambda: (status_id("in progress"),)),
+    ("get_tasks_by_status_page", query.TASKS_BY_STATUS_PAGE_SQL,
+     lambda: (status_id("completed"), 0, 100)),
+    ("get_incomplete_tasks_page", query.INCOMPLETE_TASKS_PAGE_SQL,
+     lambda: (status_id("completed"), 0, 100)),
+]
+
+
+def task_relations(cur):
+    """Return the tasks table and its partitions, if any."""
+    cur.execute("""
+        SELECT inhrelid::regclass::text
+        FROM pg_inherits
+        WHERE inhparent = 'tasks'::regclass;
+    """)
+    return {"tasks"} | {row[0] for row in cur.fetchall()}
+
+
+def scanned(node, relations):
+    """Yield the tasks relations a plan tree reads."""
+    if node.get("Relation Name") in relations:
+        yield node["Relation Name"]
+    for child in node.get("Plans", []):
+        yield from scanned(child, relations)
+
+
+def measure_queries(repetitions, show_plans):
+    """EXPLAIN ANALYZE every status-filtered query against the current tasks layout."""
+    results = {}
+    with connection() as conn:
+        with conn.cursor() as cur:
+            relations = task_relations(cur)
+            partitions = len(relations) - 1
+            for name, sql, build_params in STATUS_QUERIES:
+                plan, rows, elapsed = measure_plan(cur, sql, build_params(), repetitions)
+                read = set(scanned(plan, relations))
+                results[name] = {
+                    "rows": rows,
+                    "ms": elapsed,
+                    "buffers": plan.get("Shared Hit Blocks", 0) + plan.get("Shared Read Blocks", 0),
+                    "scanned": f"{len(read - {'tasks'})}/{partitions}" if partitions else "-",
+                }
+                if show_plans:
+                    print(f"\n{name}")
+                    for line in plan_lines(plan):
+                        print(f"    {line}")
+    return results
+
+
+def run(partition_by, hash_partitions, repetitions, show_plans):
+    """Compare the status-filtered queries before and after partitioning tasks."""
+    print("Before partitioning:")
+    before = measure_queries(repetitions, show_plans)
+    with connection() as conn:
+        if not partition_tasks(conn, partition_by, hash_partitions):
+            print(f"tasks was already partitioned by {partition_by}; both runs use the same layout")
+    print(f"\nAfter partitioning by {partition_by}:")
+    after = measure_queries(repetitions, show_plans)
+
+    print(f"\nmedian of {repetitions} runs; buffers are shared blocks hit or read")
+    print(f"{'query':<34}{'rows':>10}{'ms before':>11}{'ms after':>10}"
+          f"{'buf before':>12}{'buf after':>11}{'partitions':>12}")
+    for name, old in before.items():
+        new = after[name]
+        print(f"{name:<34}{new['rows']:>10,}{old['ms']:>11.1f}{new['ms']:>10.1f}"
+              f"{old['buffers']:>12,}{new['buffers']:>11,}{new['scanned']:>12}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Partition pruning of the status-filtered queries")
+    parser.add_argument("--setup", choices=list(SCALES),
+                        help="recreate and seed an unpartitioned database at this scale first")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="seeding processes")
+    parser.add_argument("--partition-by", choices=list(PARTITION_STRATEGIES), default="status")
+    parser.add_argument("--partitions", type=int, default=tasks_hash_partitions,
+                        help="hash partitions for --partition-by user")
+    parser.add_argument("--repetitions", type=int, default=5)
+    parser.add_argument("--plans", action="store_true", help="print every plan tree")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.setup:
+        setup(args.setup, args.seed, args.workers, partition_by=None)
+    run(args.partition_by, args.partitions, args.repetitions, args.plans)
@@ -0,0 +1,38 @@
+import argparse
+import statistics
+
+import query
+from bench_utils import measure, percentile
+from prepared import registry
+
+
+def run(calls, warmup, task_id, user_id):
+    """Compare plain SQL text with PREPARE/EXECUTE for the hottest lookups."""
+    lookups = [
+        ("get_user_by_task_id", query.get_user_by_task_id, (task_id,)),
+        ("get_tasks_by_user", query.get_tasks_by_user, (user_id,)),
+    ]
+    print(f"{calls} calls per case, {warmup} warmup calls")
+    print(f"{'function':<22}{'mode':<10}{'p50, ms':>10}{'p99, ms':>10}{'mean, ms':>10}")
+    for name, func, args in lookups:
+        for enabled in (False, True):
+            registry.enabled = enabled
+            samples = measure(func, args, calls, warmup)
+            mode = "prepared" if enabled else "plain"
+            print(f"{name:<22}{mode:<10}{percentile(samples, 50):>10.3f}"
+                  f"{percentile(samples, 99):>10.3f}{statistics.fmean(samples):>10.3f}")
+    registry.enabled = True
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Plain SQL vs prepared statements latency")
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--task-id", type=int, default=1)
+    parser.add_argument("--user-id", type=int, default=2)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.calls, args.warmup, args.task_id, args.user_id)
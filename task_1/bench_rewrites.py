@@ -0,0 +1,79 @@
+import argparse
+
+import query
+from bench import SCALES, setup
+from bench_utils import measure_plan, plan_lines
+from db import connection
+from statuses import status_id
+
+# The original forms of the filter queries, kept to compare with query.py
+OLD_USERS_WITHOUT_TASKS_SQL = """
+    SELECT id, fullname, email
+    FROM users
+    WHERE id NOT IN (SELECT user_id FROM tasks);
+"""
+
+OLD_INCOMPLETE_TASKS_SQL = """
+    SELECT tasks.id, tasks.title, tasks.description, status.name AS status
+    FROM tasks
+    JOIN status ON tasks.status_id = status.id
+    WHERE status.name != 'completed';
+"""
+
+OLD_TASKS_WITHOUT_DESCRIPTION_SQL = """
+    SELECT id, title, user_id, status_id
+    FROM tasks
+    WHERE description IS NULL OR description = '';
+"""
+
+# (function, old SQL and parameters, new SQL from query.py and a builder of its parameters)
+REWRITES = [
+    ("get_users_without_tasks", OLD_USERS_WITHOUT_TASKS_SQL, query.USERS_WITHOUT_TASKS_SQL, None),
+    ("get_incomplete_tasks", OLD_INCOMPLETE_TASKS_SQL, query.INCOMPLETE_TASKS_SQL,
+     lambda: (status_id("completed"),)),
+    ("get_tasks_without_description", OLD_TASKS_WITHOUT_DESCRIPTION_SQL,
+     query.TASKS_WITHOUT_DESCRIPTION_SQL, None),
+]
+
+
+def run(repetitions, null_user_task):
+    """Print the plans, row counts and median execution times of the old and new forms."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM tasks;")
+            print(f"tasks: {cur.fetchone()[0]:,}, median of {repetitions} runs")
+            if null_user_task:
+                # NOT IN yields no rows at all once the subquery contains a NULL
+                cur.execute(
+                    "INSERT INTO tasks (title, status_id, user_id) VALUES (%s, %s, NULL);",
+                    ("task without user", status_id("new")),
+                )
+            for name, old_sql, new_sql, build_params in REWRITES:
+                params = build_params() if build_params else None
+                print(f"\n{name}")
+                for label, sql, args in (("old", old_sql, None), ("new", new_sql, params)):
+                    plan, rows, elapsed = measure_plan(cur, sql, args, repetitions)
+                    print(f"  {label}: {rows:,} rows, {elapsed:,.1f} ms")
+                    for line in plan_lines(plan):
+                        print(f"      {line}")
+            # Nothing here is meant to persist, including the NULL-user task
+            conn.rollback()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Old vs rewritten filter queries: plans and timings")
+    parser.add_argument("--setup", choices=list(SCALES),
+                        help="recreate and seed the database at this scale first, e.g. 10m")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="seeding processes")
+    parser.add_argument("--repetitions", type=int, default=5)
+    parser.add_argument("--null-user-task", action="store_true",
+                        help="add a task without a user (rolled back) to show the NOT IN result")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.setup:
+        setup(args.setup, args.seed, args.workers)
+    run(args.repetitions, args.null_user_task)
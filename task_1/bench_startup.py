@@ -0,0 +1,105 @@
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from cli import COMMANDS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# "import time: self [us] | cumulative | imported package", nested imports indented by two spaces
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+def importtime(directory, script):
+    """Import a command's script in a fresh interpreter under -X importtime.
+
+    Returns the wall time, the script's cumulative import time and its heaviest
+    direct imports, all in ms, or the last line of the error if the import failed.
+    """
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {script}"],
+        cwd=directory, capture_output=True, text=True,
+    )
+    wall = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1]}
+    entries = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            entries.append((len(match[3]) // 2, match[4], int(match[2]) / 1000))
+    # Children are printed before their parent, so the direct imports of the script
+    # are the depth-1 entries right before it
+    index = max(i for i, (depth, name, _) in enumerate(entries) if depth == 0 and name == script)
+    children = []
+    for depth, name, cumulative in reversed(entries[:index]):
+        if depth == 0:
+            break
+        if depth == 1:
+            children.append((cumulative, name))
+    return {"wall_ms": wall, "import_ms": entries[index][2], "heaviest": sorted(children, reverse=True)[:3]}
+
+
+def measure(directory, script, repetitions):
+    samples = [importtime(directory, script) for _ in range(repetitions)]
+    failed = [sample for sample in samples if "error" in sample]
+    if failed:
+        return failed[0]
+    return {
+        "wall_ms": statistics.median(sample["wall_ms"] for sample in samples),
+        "import_ms": statistics.median(sample["import_ms"] for sample in samples),
+        "heaviest": samples[-1]["heaviest"],
+    }
+
+
+def checkout(revision, target):
+    """Extract task_1 as of a git revision into `target` and return its path."""
+    archive = subprocess.run(
+        ["git", "archive", revision, "."], cwd=HERE, capture_output=True, check=True
+    ).stdout
+    subprocess.run(["tar", "-x", "-C", target], input=archive, check=True)
+    return target
+
+
+def run(commands, baseline, repetitions):
+    """Print the cold-start cost of each command: interpreter wall time and script import time."""
+    with tempfile.TemporaryDirectory() as tmp:
+        trees = {"current": HERE}
+        if baseline:
+            trees[baseline] = checkout(baseline, tmp)
+        print(f"median of {repetitions} fresh interpreters, ms")
+        print(f"{'command':<8}{'tree':<12}{'wall':>8}{'import':>9}  heaviest direct imports")
+        for command in commands:
+            script = COMMANDS[command][0]
+            for label, directory in trees.items():
+                result = measure(directory, script, repetitions)
+                if "error" in result:
+                    print(f"{command:<8}{label:<12}  failed: {result['error']}")
+                    continue
+                heaviest = ", ".join(f"{name} {ms:.0f}" for ms, name in result["heaviest"])
+                print(f"{command:<8}{label:<12}{result['wall_ms']:>8.0f}{result['import_ms']:>9.1f}  {heaviest}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start time of the cli.py commands")
+    parser.add_argument("commands", nargs="*", metavar="command",
+                        help=f"any of {', '.join(COMMANDS)}; all of them by default")
+    parser.add_argument("--baseline", help="git revision to compare with, e.g. HEAD~1")
+    parser.add_argument("--repetitions", type=int, default=5)
+    args = parser.parse_args(argv)
+    unknown = set(args.commands) - set(COMMANDS)
+    if unknown:
+        parser.error(f"unknown commands: {', '.join(sorted(unknown))}")
+    args.commands = args.commands or list(COMMANDS)
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.commands, args.baseline, args.repetitions)
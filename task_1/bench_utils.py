@@ -0,0 +1,52 @@
+import json
+import statistics
+import time
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def measure(func, args, calls, warmup):
+    """Call func(*args) `warmup` times untimed, then `calls` times; returns the latencies in ms."""
+    for _ in range(warmup):
+        func(*args)
+    samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        func(*args)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def explain_analyze(cur, sql, params):
+    """Run a statement under EXPLAIN ANALYZE; returns (plan, rows, execution ms)."""
+    cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+    result = cur.fetchone()[0]
+    if isinstance(result, str):
+        result = json.loads(result)
+    plan = result[0]["Plan"]
+    return plan, plan["Actual Rows"], result[0]["Execution Time"]
+
+
+def measure_plan(cur, sql, params, repetitions):
+    """EXPLAIN ANALYZE a statement `repetitions` times; returns (last plan, rows, median ms)."""
+    timings = []
+    for _ in range(repetitions):
+        plan, rows, elapsed = explain_analyze(cur, sql, params)
+        timings.append(elapsed)
+    return plan, rows, statistics.median(timings)
+
+
+def plan_lines(node, depth=0):
+    """Yield one indented line per plan node: type, relation and index."""
+    line = "  " * depth + node["Node Type"]
+    if "Relation Name" in node:
+        line += f" on {node['Relation Name']}"
+    if "Index Name" in node:
+        line += f" using {node['Index Name']}"
+    yield line
+    for child in node.get("Plans", []):
+        yield from plan_lines(child, depth + 1)
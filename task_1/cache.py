@@ -0,0 +1,151 @@
+import abc
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# The result cache is off unless QUERY_CACHE=1
+cache_enabled = os.getenv("QUERY_CACHE", "0") == "1"
+cache_max_entries = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+cache_ttl = float(os.getenv("QUERY_CACHE_TTL", "30"))
+# Larger results are returned but not cached, which keeps memory bounded
+cache_max_rows = int(os.getenv("QUERY_CACHE_MAX_ROWS", "10000"))
+
+MISSING = object()
+
+
+class CacheBackend(abc.ABC):
+    """Storage interface of the result cache.
+
+    Keys are tuples of (function name, args). Implement this interface
+    (e.g. over Redis) to share the cache between processes.
+    """
+
+    @abc.abstractmethod
+    def get(self, key):
+        """Return the cached value or MISSING."""
+
+    @abc.abstractmethod
+    def set(self, key, value):
+        """Store a value under a key."""
+
+    @abc.abstractmethod
+    def delete(self, key):
+        """Remove a key if it is cached."""
+
+    @abc.abstractmethod
+    def clear(self):
+        """Remove every entry."""
+
+    def stats(self):
+        return {}
+
+
+class LRUCache(CacheBackend):
+    """Thread-safe in-process LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, max_entries=cache_max_entries, ttl=cache_ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value), LRU first
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class ReadCache:
+    """Read-through cache in front of query functions, invalidated by the writes."""
+
+    def __init__(self, backend=None, enabled=cache_enabled, max_rows=cache_max_rows):
+        self.backend = backend or LRUCache()
+        self.enabled = enabled
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; a read that raced with a write is not stored
+        self._version = 0
+        self.skipped = 0
+
+    def cached(self, func):
+        """Decorate a read function so its results are cached by (name, args)."""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.enabled or kwargs:
+                return func(*args, **kwargs)
+            key = (func.__name__, args)
+            value = self.backend.get(key)
+            if value is not MISSING:
+                return list(value)
+            version = self._version
+            result = func(*args)
+            if len(result) > self.max_rows:
+                self.skipped += 1
+            else:
+                with self._lock:
+                    if version == self._version:
+                        self.backend.set(key, tuple(result))
+            return result
+
+        return wrapper
+
+    def invalidate(self, *keys):
+        """Drop the given (function name, args) entries."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._version += 1
+            for key in keys:
+                self.backend.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self.backend.clear()
+
+    def stats(self):
+        return {**self.backend.stats(), "too_large": self.skipped}
+
+
+read_cache = ReadCache()
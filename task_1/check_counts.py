@@ -0,0 +1,70 @@
+import argparse
+import sys
+
+from db import connection
+from init import rebuild_task_counters
+
+# Rows where the maintained counter differs from a full recount of tasks
+STATUS_MISMATCHES_SQL = """
+    SELECT COALESCE(recount.status_id, counter.status_id) AS status_id,
+           COALESCE(recount.task_count, 0) AS expected,
+           COALESCE(counter.task_count, 0) AS actual
+    FROM (
+        SELECT status_id, COUNT(*) AS task_count
+        FROM tasks
+        WHERE status_id IS NOT NULL
+        GROUP BY status_id
+    ) AS recount
+    FULL JOIN task_counts_by_status AS counter ON counter.status_id = recount.status_id
+    WHERE COALESCE(recount.task_count, 0) <> COALESCE(counter.task_count, 0);
+"""
+
+USER_MISMATCHES_SQL = """
+    SELECT COALESCE(recount.user_id, counter.user_id) AS user_id,
+           COALESCE(recount.task_count, 0) AS expected,
+           COALESCE(counter.task_count, 0) AS actual
+    FROM (
+        SELECT user_id, COUNT(*) AS task_count
+        FROM tasks
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id
+    ) AS recount
+    FULL JOIN task_counts_by_user AS counter ON counter.user_id = recount.user_id
+    WHERE COALESCE(recount.task_count, 0) <> COALESCE(counter.task_count, 0);
+"""
+
+
+def check_task_counts(repair=False):
+    """Compare the counter tables with a full recount of tasks.
+
+    Returns a list of (kind, id, expected, actual) mismatches. With repair=True
+    the counters are rebuilt from the recount when any mismatch is found.
+    """
+    with connection() as conn:
+        with conn.cursor() as cur:
+            # A repeatable-read snapshot makes the recount and the counters agree in time
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ;")
+            cur.execute(STATUS_MISMATCHES_SQL)
+            mismatches = [("status", *row) for row in cur.fetchall()]
+            cur.execute(USER_MISMATCHES_SQL)
+            mismatches += [("user", *row) for row in cur.fetchall()]
+        conn.commit()
+        if mismatches and repair:
+            with conn.cursor() as cur:
+                cur.execute(rebuild_task_counters)
+    return mismatches
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Check task counters against a full recount")
+    parser.add_argument("--repair", action="store_true", help="rebuild the counters on mismatch")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    mismatches = check_task_counts(repair=args.repair)
+    for kind, key, expected, actual in mismatches:
+        print(f"{kind} {key}: expected {expected}, counter {actual}")
+    print(f"{len(mismatches)} mismatches" + (", counters rebuilt" if mismatches and args.repair else ""))
+    sys.exit(1 if mismatches and not args.repair else 0)
@@ -0,0 +1,136 @@
+import argparse
+import json
+import sys
+
+import query
+from bench import SCALES, setup
+from db import connection
+from prepared import registry
+from statuses import status_id
+
+# Every prepared statement of query.py with representative parameters, as
+# (function, statement name, parameters); callables build the parts that
+# depend on the data, such as status ids
+CHECKS = [
+    ("get_user_by_task_id", "get_user_by_task_id", (1,)),
+    ("get_tasks_by_user", "get_tasks_by_user", (1,)),
+    ("get_tasks_by_status", "get_tasks_by_status", lambda: (status_id("new"),)),
+    ("update_task_status", "update_task_status", lambda: (status_id("in progress"), 1)),
+    ("get_users_without_tasks", "get_users_without_tasks", None),
+    ("add_new_task_for_user", "add_new_task_for_user", lambda: ("title", "", status_id("new"), 1)),
+    ("get_incomplete_tasks",
+     lambda: query.completed_statement("get_incomplete_tasks", status_id("completed")), None),
+    ("delete_task_by_id", "delete_task_by_id", (1,)),
+    ("find_users_by_email_pattern", "find_users_by_email_pattern", ("%@example.com%",)),
+    ("find_users_by_email", "find_users_by_email", ("john@example.com",)),
+    ("find_users_by_email_domain", "find_users_by_email_domain", ("example.com", "%@example.com")),
+    ("get_users_by_domain", "get_users_by_domain", ("example.com",)),
+    ("update_user_fullname", "update_user_fullname", ("John Doe", 1)),
+    ("get_task_count_by_status", "get_task_count_by_status", None),
+    ("get_tasks_for_users_with_email_domain", "get_tasks_for_users_with_email_domain", ("example.com",)),
+    ("get_tasks_without_description", "get_tasks_without_description", None),
+    ("get_users_with_tasks_in_progress", "get_users_with_tasks_in_progress",
+     lambda: (status_id("in progress"),)),
+    ("get_users_and_task_count", "get_users_and_task_count", None),
+    ("get_tasks_by_status_page", "get_tasks_by_status_page", lambda: (status_id("new"), 0, 100)),
+    ("get_incomplete_tasks_page",
+     lambda: query.completed_statement("get_incomplete_tasks_page", status_id("completed")), (0, 100)),
+    ("get_tasks_for_users_with_email_domain_page", "get_tasks_for_users_with_email_domain_page",
+     ("example.com", 0, 100)),
+    ("get_users_by_domain_page", "get_users_by_domain_page", ("example.com", 0, 100)),
+    ("get_users_and_task_count_page", "get_users_and_task_count_page", (0, 100)),
+]
+
+# Sequential scans that are the right plan: these statements return (nearly)
+# every row of the table, so an index would only add random reads
+ALLOWED_SEQ_SCANS = {
+    "get_users_without_tasks": {"users"},
+    "get_users_and_task_count": {"users", "task_counts_by_user"},
+}
+
+
+def explain(cur, statement, params):
+    """Return the root plan node of a prepared statement's EXECUTE without running it."""
+    registry.prepare(cur, statement)
+    arguments = f" ({', '.join(['%s'] * len(params))})" if params else ""
+    cur.execute(f"EXPLAIN (FORMAT JSON) EXECUTE {statement}{arguments};", params or None)
+    plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def seq_scans(node):
+    """Yield the relation names of every Seq Scan node in a plan tree."""
+    if node.get("Node Type") == "Seq Scan":
+        yield node["Relation Name"]
+    for child in node.get("Plans", []):
+        yield from seq_scans(child)
+
+
+def table_rows(cur):
+    cur.execute("""
+        SELECT relname, reltuples::bigint
+        FROM pg_class
+        WHERE relkind IN ('r', 'p') AND relnamespace = 'public'::regnamespace;
+    """)
+    return dict(cur.fetchall())
+
+
+def check_plans(min_rows=10_000, analyze=False):
+    """Return (function, table) pairs whose plan sequentially scans a large table.
+
+    Plans come from the default planner settings, so run this against a large
+    seeded dataset (see --setup); on small tables a Seq Scan is cheaper and
+    they are skipped by min_rows. The prepared statements that query.py runs
+    are EXPLAINed with their generic plan, which Postgres switches to after
+    five executions. Scans in ALLOWED_SEQ_SCANS are reported but do not fail.
+    """
+    # Status ids are looked up before the connection below is checked out
+    checks = [
+        (
+            name,
+            statement() if callable(statement) else statement,
+            params() if callable(params) else params,
+        )
+        for name, statement, params in CHECKS
+    ]
+    failures = []
+    with connection() as conn:
+        with conn.cursor() as cur:
+            if analyze:
+                cur.execute("ANALYZE;")
+                conn.commit()
+            rows = table_rows(cur)
+            cur.execute("SET LOCAL plan_cache_mode = force_generic_plan;")
+            for name, statement, params in checks:
+                large = {
+                    table for table in seq_scans(explain(cur, statement, params))
+                    if rows.get(table, 0) >= min_rows
+                }
+                allowed = sorted(large & ALLOWED_SEQ_SCANS.get(name, set()))
+                failed = sorted(large - set(allowed))
+                notes = [f"Seq Scan on {', '.join(failed)}"] if failed else []
+                notes += [f"allowed Seq Scan on {', '.join(allowed)}"] if allowed else []
+                print(f"{'FAIL' if failed else 'ok':4}  {name}" + (f": {'; '.join(notes)}" if notes else ""))
+                failures.extend((name, table) for table in failed)
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fail if a query.py statement needs a sequential scan")
+    parser.add_argument("--min-rows", type=int, default=10_000,
+                        help="ignore sequential scans of tables smaller than this")
+    parser.add_argument("--analyze", action="store_true", help="refresh planner statistics first")
+    parser.add_argument("--setup", choices=list(SCALES),
+                        help="recreate and seed the database at this scale first, e.g. 1m")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="seeding processes")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.setup:
+        setup(args.setup, args.seed, args.workers)
+    sys.exit(1 if check_plans(args.min_rows, args.analyze) else 0)
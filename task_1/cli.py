@@ -0,0 +1,37 @@
+import argparse
+import runpy
+import sys
+
+# Command -> (script it runs, help); a script is imported only when its command runs,
+# so `cli.py drop` never loads pandas or Faker
+COMMANDS = {
+    "init": ("init", "create or migrate the schema"),
+    "seed": ("seed", "fill the tables with random data"),
+    "query": ("query", "write the query report"),
+    "drop": ("drop", "drop the tables"),
+}
+
+
+def run(command, args):
+    """Run a script's `__main__` block as if it were started as `python <script>.py args...`."""
+    script = COMMANDS[command][0]
+    sys.argv = [f"{script}.py", *args]
+    runpy.run_module(script, run_name="__main__", alter_sys=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Task management database commands",
+        epilog="Options after the command go to its script, e.g. `cli.py seed --bulk --users 100000`.",
+    )
+    parser.add_argument(
+        "command", choices=list(COMMANDS),
+        help="; ".join(f"{name}: {text}" for name, (_, text) in COMMANDS.items()),
+    )
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="options of the command's script")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.command, args.args)
@@ -0,0 +1,344 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+import instrument
+
+# Get connection parameters from environment variables or use default values
+db_host = os.getenv("POSTGRES_HOST", "localhost")
+db_name = os.getenv("POSTGRES_DB", "hw03")
+db_user = os.getenv("POSTGRES_USER", "postgres")
+db_password = os.getenv("POSTGRES_PASSWORD", "postgres")
+
+# Pool sizing, also taken from the environment
+pool_min = int(os.getenv("POSTGRES_POOL_MIN", "1"))
+pool_max = int(os.getenv("POSTGRES_POOL_MAX", "10"))
+pool_idle_timeout = float(os.getenv("POSTGRES_POOL_IDLE_TIMEOUT", "300"))
+pool_checkout_timeout = float(os.getenv("POSTGRES_POOL_CHECKOUT_TIMEOUT", "30"))
+pool_health_check_after = float(os.getenv("POSTGRES_POOL_HEALTH_CHECK_AFTER", "5"))
+
+# COPY writes NULL as \N so that it stays distinct from an empty string
+NULL_MARKER = r"\N"
+
+
+def get_connection(**kwargs):
+    """Establish a connection to the PostgreSQL database; kwargs go to psycopg2.connect()."""
+    kwargs.setdefault("cursor_factory", instrument.InstrumentedCursor)
+    return psycopg2.connect(
+        host=db_host, database=db_name, user=db_user, password=db_password, **kwargs
+    )
+
+
+class PoolError(psycopg2.Error):
+    """Raised when a connection cannot be checked out of the pool."""
+
+
+class ConnectionPool:
+    """Thread-safe pool of PostgreSQL connections built around get_connection()."""
+
+    def __init__(
+        self,
+        minconn=pool_min,
+        maxconn=pool_max,
+        idle_timeout=pool_idle_timeout,
+        checkout_timeout=pool_checkout_timeout,
+        health_check_after=pool_health_check_after,
+        connect=get_connection,
+    ):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("pool size must satisfy 0 <= minconn <= maxconn, maxconn >= 1")
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check_after = health_check_after
+        self._connect = connect
+        self._cond = threading.Condition()
+        self._idle = deque()  # (conn, returned_at), oldest on the left
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+        self._checkouts = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._checkout_total = 0.0
+        self._checkout_max = 0.0
+
+        for _ in range(minconn):
+            self._idle.append((connect(), time.monotonic()))
+            self._size += 1
+
+    def getconn(self, timeout=None):
+        """Check out a healthy connection, waiting up to `timeout` seconds for one."""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.perf_counter()
+        deadline = time.monotonic() + timeout
+        while True:
+            conn, idle_since, expired = self._acquire(deadline)
+            self._close_all(expired)
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except BaseException:
+                    self._release_slot()
+                    raise
+            elif not self._is_healthy(conn, idle_since):
+                self._discard(conn)
+                continue
+            break
+
+        waited = time.perf_counter() - started
+        with self._cond:
+            self._checkouts += 1
+            self._checkout_total += waited
+            self._checkout_max = max(self._checkout_max, waited)
+        return conn
+
+    def putconn(self, conn, close=False):
+        """Return a connection to the pool, resetting any open transaction."""
+        if not close and not conn.closed:
+            status = conn.get_transaction_status()
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+
+        if close or conn.closed or self._closed:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        """Close every idle connection and refuse further checkouts."""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._size -= len(idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        self._close_all(idle)
+
+    def stats(self):
+        """Return a snapshot of pool usage for sizing decisions."""
+        with self._cond:
+            checkouts = self._checkouts
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "waiting": self._waiting,
+                "max_size": self.maxconn,
+                "checkouts": checkouts,
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+                "avg_checkout_ms": (self._checkout_total / checkouts * 1000) if checkouts else 0.0,
+                "max_checkout_ms": self._checkout_max * 1000,
+            }
+
+    def _acquire(self, deadline):
+        """Reserve an idle connection or a slot for a new one; returns expired connections to close."""
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolError("connection pool is closed")
+                expired = self._reap_idle()
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    self._in_use += 1
+                    return conn, idle_since, expired
+                if self._size < self.maxconn:
+                    self._size += 1
+                    self._in_use += 1
+                    return None, None, expired
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolError(
+                        f"no connection available within {self.checkout_timeout}s "
+                        f"({self.maxconn} in use)"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+    def _reap_idle(self):
+        """Drop connections idle longer than idle_timeout while keeping minconn open."""
+        expired = []
+        now = time.monotonic()
+        while (
+            self._idle
+            and self._size > self.minconn
+            and now - self._idle[0][1] > self.idle_timeout
+        ):
+            expired.append(self._idle.popleft()[0])
+            self._size -= 1
+        return expired
+
+    def _is_healthy(self, conn, idle_since):
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.health_check_after:
+            return True
+        try:
+            # A plain cursor keeps health checks out of the query statistics
+            with conn.cursor(cursor_factory=extensions.cursor) as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        self._close_all([conn])
+        self._release_slot()
+        with self._cond:
+            self._discarded += 1
+
+    def _release_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._in_use -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close_all(conns):
+        for conn in conns:
+            try:
+                conn.close()
+            except psycopg2.Error:
+                pass
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+# Pools a forked child inherited from its parent. Their connections share the
+# parent's sockets: closing them, or letting them be garbage-collected, sends
+# Terminate and ends the parent's sessions, so the child keeps them referenced
+# and never touches them again
+_inherited_pools = []
+
+
+def _forget_inherited_pool():
+    """Drop the parent's pool in a forked child without closing its connections."""
+    global _pool, _pool_pid, _pool_lock
+    if _pool is not None and _pool_pid != os.getpid():
+        _inherited_pools.append(_pool)
+        _pool = _pool_pid = None
+    # Another thread of the parent may have held the lock at the time of the fork
+    _pool_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_inherited_pool)
+
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        # A forked child must not reuse the parent's sockets, nor close them
+        if _pool is not None and _pool_pid != os.getpid():
+            _inherited_pools.append(_pool)
+            _pool = None
+        if _pool is None:
+            _pool = ConnectionPool()
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def close_pool():
+    """Close the process-wide connection pool if it was created in this process."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.closeall()
+        elif _pool is not None:
+            _inherited_pools.append(_pool)
+        _pool = None
+
+
+@contextmanager
+def pool_override(pool):
+    """Make get_pool() return `pool` inside the block, e.g. to pin tests to one connection."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        saved = _pool, _pool_pid
+        _pool, _pool_pid = pool, os.getpid()
+    try:
+        yield pool
+    finally:
+        with _pool_lock:
+            _pool, _pool_pid = saved
+
+
+@contextmanager
+def connection():
+    """Borrow a pooled connection; commit on success, roll back on error."""
+    pool = get_pool()
+    started = time.perf_counter()
+    conn = pool.getconn()
+    instrument.note_checkout_wait(time.perf_counter() - started)
+    broken = False
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            broken = True
+        raise
+    finally:
+        pool.putconn(conn, close=broken)
+
+
+def copy_out_sql(statement):
+    """Return COPY ... TO STDOUT of a statement as CSV with a header and NULL as NULL_MARKER."""
+    return f"COPY ({statement}) TO STDOUT WITH (FORMAT csv, HEADER true, NULL '{NULL_MARKER}')"
+
+
+@contextmanager
+def copy_pipe(cur, copy_sql):
+    """Run a COPY ... TO STDOUT on `cur` in a background thread and yield the read end of a pipe.
+
+    The whole output is never buffered in Python; errors of the COPY are raised
+    when the block exits.
+    """
+    read_fd, write_fd = os.pipe()
+    errors = []
+
+    def produce():
+        with os.fdopen(write_fd, "wb") as writer:
+            try:
+                cur.copy_expert(copy_sql, writer)
+            except BaseException as err:  # reported to the consumer below
+                errors.append(err)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    with os.fdopen(read_fd, "rb") as reader:
+        try:
+            yield reader
+        finally:
+            # Closing the reader unblocks a producer the consumer abandoned
+            reader.close()
+            producer.join()
+            if errors and not isinstance(errors[0], BrokenPipeError):
+                raise errors[0]
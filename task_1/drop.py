@@ -1,25 +1,12 @@
-import psycopg2
-import os
-
-# Get connection parameters from environment variables or use default values
-db_host = os.getenv('POSTGRES_HOST', 'localhost')
-db_name = os.getenv('POSTGRES_DB', 'hw03')
-db_user = os.getenv('POSTGRES_USER', 'postgres')
-db_password = os.getenv('POSTGRES_PASSWORD', 'postgres')
-
-def get_connection():
-    """Establish a connection to the PostgreSQL database."""
-    return psycopg2.connect(
-        host=db_host,
-        database=db_name,
-        user=db_user,
-        password=db_password
-    )
+from db import connection
 
 def drop_tables():
-    """Drop the users, tasks, and status tables if they exist."""
-    with get_connection() as conn:
+    """Drop the users, tasks, and status tables with their helper tables if they exist."""
+    with connection() as conn:
         with conn.cursor() as cur:
+            cur.execute("DROP TABLE IF EXISTS task_counts_by_status, task_counts_by_user;")
+            # Without the migration history init.py recreates the schema from scratch
+            cur.execute("DROP TABLE IF EXISTS schema_migrations;")
             # Disable foreign key checks temporarily
             cur.execute("DROP TABLE IF EXISTS tasks CASCADE;")
             cur.execute("DROP TABLE IF EXISTS status CASCADE;")
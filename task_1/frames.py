@@ -0,0 +1,111 @@
+import contextlib
+import itertools
+
+import pandas as pd
+
+import query
+from db import NULL_MARKER, connection, copy_out_sql, copy_pipe
+from statuses import status_id
+
+# pandas dtypes for the Postgres type OIDs used by the schema
+PG_DTYPES = {
+    16: "boolean",    # bool
+    20: "Int64",      # int8
+    21: "Int64",      # int2
+    23: "Int64",      # int4
+    700: "Float64",   # float4
+    701: "Float64",   # float8
+    1700: "Float64",  # numeric
+    25: "string",     # text
+    1042: "string",   # bpchar
+    1043: "string",   # varchar
+}
+
+# Rows per DataFrame yielded by iter_frames
+DEFAULT_CHUNK_ROWS = 100_000
+
+# Read queries of query.py by function name, with a builder of their parameters
+FRAME_QUERIES = {
+    "get_tasks_by_user": (query.TASKS_BY_USER_SQL, lambda user_id: (user_id,)),
+    "get_tasks_by_status": (query.TASKS_BY_STATUS_SQL, lambda name: (status_id(name),)),
+    "get_users_without_tasks": (query.USERS_WITHOUT_TASKS_SQL, lambda: None),
+    "get_incomplete_tasks": (query.INCOMPLETE_TASKS_SQL, lambda: (status_id("completed"),)),
+    "find_users_by_email_pattern": (query.USERS_BY_EMAIL_PATTERN_SQL, lambda pattern: (pattern,)),
+    "get_task_count_by_status": (query.TASK_COUNT_BY_STATUS_SQL, lambda: None),
+    "get_tasks_for_users_with_email_domain": (
+        query.TASKS_FOR_EMAIL_DOMAIN_SQL, lambda domain: (query.normalize_domain(domain),)
+    ),
+    "get_users_by_domain": (
+        query.USERS_BY_DOMAIN_SQL, lambda domain: (query.normalize_domain(domain),)
+    ),
+    "get_tasks_without_description": (query.TASKS_WITHOUT_DESCRIPTION_SQL, lambda: None),
+    "get_users_with_tasks_in_progress": (
+        query.USERS_WITH_TASKS_IN_PROGRESS_SQL, lambda: (status_id("in progress"),)
+    ),
+    "get_users_and_task_count": (query.USERS_AND_TASK_COUNT_SQL, lambda: None),
+}
+
+_cursor_names = itertools.count(1)
+
+
+def _statement(cur, sql, params):
+    """Return the statement with parameters inlined and without the trailing semicolon."""
+    return cur.mogrify(sql.strip().rstrip(";"), params).decode()
+
+
+def describe(cur, statement):
+    """Return column names and pandas dtypes of a statement from the cursor description."""
+    cur.execute(f"SELECT * FROM ({statement}) AS q LIMIT 0;")
+    names = [column.name for column in cur.description]
+    dtypes = {column.name: PG_DTYPES.get(column.type_code, "object") for column in cur.description}
+    return names, dtypes
+
+
+@contextlib.contextmanager
+def copy_stream(sql, params=None):
+    """Stream a query as CSV through COPY ... TO STDOUT and an OS pipe.
+
+    Yields (names, dtypes, binary file) on a pooled connection; see db.copy_pipe().
+    """
+    with connection() as conn:
+        with conn.cursor() as cur:
+            statement = _statement(cur, sql, params)
+            names, dtypes = describe(cur, statement)
+            with copy_pipe(cur, copy_out_sql(statement)) as reader:
+                yield names, dtypes, reader
+
+
+def _read_csv(reader, dtypes, **kwargs):
+    return pd.read_csv(
+        reader, dtype=dtypes, na_values=[NULL_MARKER], keep_default_na=False, **kwargs
+    )
+
+
+def read_frame(sql, params=None):
+    """Fetch a query into a typed DataFrame via COPY, without intermediate tuples."""
+    with copy_stream(sql, params) as (_, dtypes, reader):
+        return _read_csv(reader, dtypes)
+
+
+def iter_frames(sql, params=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Stream a query as typed DataFrames of up to `chunk_rows` rows via COPY."""
+    with copy_stream(sql, params) as (_, dtypes, reader):
+        yield from _read_csv(reader, dtypes, chunksize=chunk_rows)
+
+
+def iter_frames_cursor(sql, params=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Stream a query as DataFrames through a server-side cursor and fetchmany()."""
+    with connection() as conn:
+        with conn.cursor(name=f"frames_{next(_cursor_names)}") as cur:
+            cur.itersize = chunk_rows
+            cur.execute(sql, params)
+            while rows := cur.fetchmany(chunk_rows):
+                yield pd.DataFrame.from_records(
+                    rows, columns=[column.name for column in cur.description]
+                )
+
+
+def query_frame(name, *args):
+    """Run a read function of query.py by name and return its result as a DataFrame."""
+    sql, build_params = FRAME_QUERIES[name]
+    return read_frame(sql, build_params(*args))
@@ -1,22 +1,16 @@
+import argparse
+import contextlib
 import os
-import psycopg2
 
-# Отримуємо параметри підключення з змінних середовища або використовуємо значення за замовчуванням
-db_host = os.getenv('POSTGRES_HOST', 'localhost')
-db_name = os.getenv('POSTGRES_DB', 'hw03')
-db_user = os.getenv('POSTGRES_USER', 'postgres')
-db_password = os.getenv('POSTGRES_PASSWORD', 'postgres')
+from psycopg2 import extensions
 
-# Параметри підключення до PostgreSQL
-conn = psycopg2.connect(
-    host=db_host,
-    database=db_name,
-    user=db_user,
-    password=db_password
-)
+import statuses
+from db import connection
 
-# Створення курсора для виконання SQL-запитів
-cur = conn.cursor()
+# Необов'язкове секціонування tasks: 'status' — за списком status_id, щоб
+# завершені (холодні) завдання лежали в окремій секції, 'user' — за хешем user_id
+tasks_partition_by = os.getenv("TASKS_PARTITION_BY", "")
+tasks_hash_partitions = int(os.getenv("TASKS_HASH_PARTITIONS", "8"))
 
 # Створюємо таблицю users
 create_users_table = """
@@ -26,7 +20,6 @@ CREATE TABLE IF NOT EXISTS users (
     email VARCHAR(100) NOT NULL UNIQUE
 );
 """
-cur.execute(create_users_table)
 
 # Створюємо таблицю status
 create_status_table = """
@@ -35,7 +28,6 @@ CREATE TABLE IF NOT EXISTS status (
     name VARCHAR(50) NOT NULL UNIQUE
 );
 """
-cur.execute(create_status_table)
 
 # Додаємо початкові записи у таблицю status
 insert_statuses = """
@@ -46,7 +38,6 @@ VALUES
     ('completed')
 ON CONFLICT (name) DO NOTHING;
 """
-cur.execute(insert_statuses)
 
 # Створюємо таблицю tasks з каскадним видаленням для зовнішнього ключа user_id
 create_tasks_table = """
@@ -58,13 +49,358 @@ CREATE TABLE IF NOT EXISTS tasks (
     user_id INTEGER REFERENCES users(id) ON DELETE CASCADE
 );
 """
-cur.execute(create_tasks_table)
 
-# Фіксуємо зміни у базі даних
-conn.commit()
+# Індекси для фільтрів у запитах query.py
+create_tasks_indexes = """
+CREATE INDEX IF NOT EXISTS tasks_user_id_idx ON tasks (user_id);
+CREATE INDEX IF NOT EXISTS tasks_status_id_idx ON tasks (status_id);
+CREATE INDEX IF NOT EXISTS tasks_without_description_idx ON tasks (id)
+    WHERE description IS NULL OR description = '';
+"""
+
+# Частковий індекс для незавершених завдань. Предикат має бути константою,
+# тому id статусу 'completed' підставляємо під час міграції
+create_incomplete_tasks_index = """
+DO $$
+BEGIN
+    EXECUTE format(
+        'CREATE INDEX IF NOT EXISTS tasks_incomplete_idx ON tasks (id) WHERE status_id <> %s',
+        (SELECT id FROM status WHERE name = 'completed')
+    );
+END
+$$;
+"""
+
+# Триграмний індекс для пошуку за суфіксом email (LIKE '%@domain')
+create_email_trgm_index = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS users_email_trgm_idx ON users USING gin (email gin_trgm_ops);
+"""
+
+# Лічильники завдань за статусами та користувачами, які підтримують тригери,
+# щоб агрегати в query.py не перераховували всю таблицю tasks
+create_task_counters = """
+CREATE TABLE IF NOT EXISTS task_counts_by_status (
+    status_id INTEGER PRIMARY KEY REFERENCES status(id) ON DELETE CASCADE,
+    task_count BIGINT NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS task_counts_by_user (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    task_count BIGINT NOT NULL DEFAULT 0
+);
+"""
+
+# Лічильники змінюють тригери рівня інструкції: кожна інструкція підсумовує
+# зміни з таблиць переходу й оновлює кожен рядок лічильника один раз, у порядку
+# ключа, тож паралельні транзакції блокують лічильники в однаковому порядку і не
+# взаємоблокуються. Завдання без статусу чи користувача не враховуються. Сеанс
+# з task_counts.deferred = on лічильники не змінює: масове завантаження
+# перераховує їх наприкінці через rebuild_task_counters
+create_task_counter_functions = """
+CREATE OR REPLACE FUNCTION tasks_count_changes() RETURNS trigger AS $$
+DECLARE
+    changes TEXT;
+BEGIN
+    IF current_setting('task_counts.deferred', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    changes := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT status_id, user_id, 1 AS delta FROM new_rows'
+        WHEN 'DELETE' THEN 'SELECT status_id, user_id, -1 AS delta FROM old_rows'
+        ELSE 'SELECT status_id, user_id, 1 AS delta FROM new_rows '
+             || 'UNION ALL SELECT status_id, user_id, -1 FROM old_rows'
+    END;
+    EXECUTE format($sql$
+        INSERT INTO task_counts_by_status (status_id, task_count)
+        SELECT status_id, sum(delta) FROM (%s) AS changes
+        WHERE status_id IS NOT NULL
+        GROUP BY status_id HAVING sum(delta) <> 0
+        ORDER BY status_id
+        ON CONFLICT (status_id)
+        DO UPDATE SET task_count = task_counts_by_status.task_count + EXCLUDED.task_count
+    $sql$, changes);
+    -- Рядок користувача міг бути вже видалений каскадом з users
+    EXECUTE format($sql$
+        INSERT INTO task_counts_by_user (user_id, task_count)
+        SELECT user_id, sum(delta) FROM (%s) AS changes
+        WHERE user_id IS NOT NULL AND EXISTS (SELECT 1 FROM users WHERE users.id = changes.user_id)
+        GROUP BY user_id HAVING sum(delta) <> 0
+        ORDER BY user_id
+        ON CONFLICT (user_id)
+        DO UPDATE SET task_count = task_counts_by_user.task_count + EXCLUDED.task_count
+    $sql$, changes);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tasks_reset_counts() RETURNS trigger AS $$
+BEGIN
+    UPDATE task_counts_by_status SET task_count = 0;
+    UPDATE task_counts_by_user SET task_count = 0;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+# Таблиці переходу дозволені лише для тригера на одну подію і без списку
+# стовпців, тому оновлення, які не змінюють статус чи користувача, дають
+# нульові суми й не торкаються лічильників
+create_task_counter_triggers = """
+DROP TRIGGER IF EXISTS tasks_counts_insert ON tasks;
+CREATE TRIGGER tasks_counts_insert AFTER INSERT ON tasks
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION tasks_count_changes();
+DROP TRIGGER IF EXISTS tasks_counts_delete ON tasks;
+CREATE TRIGGER tasks_counts_delete AFTER DELETE ON tasks
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION tasks_count_changes();
+DROP TRIGGER IF EXISTS tasks_counts_update ON tasks;
+CREATE TRIGGER tasks_counts_update AFTER UPDATE ON tasks
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION tasks_count_changes();
+DROP TRIGGER IF EXISTS tasks_counts_truncate ON tasks;
+CREATE TRIGGER tasks_counts_truncate AFTER TRUNCATE ON tasks
+    FOR EACH STATEMENT EXECUTE FUNCTION tasks_reset_counts();
+"""
+
+# Повний перерахунок лічильників; блокування не дає змінити tasks під час перерахунку
+rebuild_task_counters = """
+LOCK TABLE tasks IN SHARE ROW EXCLUSIVE MODE;
+DELETE FROM task_counts_by_status;
+DELETE FROM task_counts_by_user;
+INSERT INTO task_counts_by_status (status_id, task_count)
+SELECT status_id, COUNT(*) FROM tasks WHERE status_id IS NOT NULL GROUP BY status_id;
+INSERT INTO task_counts_by_user (user_id, task_count)
+SELECT user_id, COUNT(*) FROM tasks WHERE user_id IS NOT NULL GROUP BY user_id;
+"""
+
+# Покривний частковий індекс для завдань без опису: один предикат замість OR
+# збігається з умовою запиту, а INCLUDE дає index-only scan без читання опису
+replace_tasks_without_description_index = """
+DROP INDEX IF EXISTS tasks_without_description_idx;
+CREATE INDEX tasks_without_description_idx ON tasks (id) INCLUDE (title, user_id, status_id)
+    WHERE COALESCE(description, '') = '';
+"""
+
+# Нормалізований домен email як збережений обчислюваний стовпець з індексом
+# (email_domain, id) для пошуку і посторінкового читання за доменом, а також
+# індекс text_pattern_ops для пошуку за префіксом email (LIKE 'abc%').
+# Додавання стовпця переписує таблицю users під ексклюзивним блокуванням
+add_email_domain = """
+ALTER TABLE users ADD COLUMN IF NOT EXISTS email_domain TEXT
+    GENERATED ALWAYS AS (lower(substring(email FROM '@([^@]*)$'))) STORED;
+CREATE INDEX IF NOT EXISTS users_email_domain_idx ON users (email_domain, id);
+CREATE INDEX IF NOT EXISTS users_email_prefix_idx ON users (email text_pattern_ops);
+"""
+
+# Стратегії секціонування як їх записує pg_partitioned_table.partstrat
+PARTITION_STRATEGIES = {"status": "l", "user": "h"}
+
+# Стовпці ключа секціонування tasks
+PARTITION_KEYS = {"status": "status_id", "user": "user_id"}
+
+# Поточна стратегія секціонування tasks (NULL для звичайної таблиці), кількість
+# секцій і чи є в tasks первинний ключ
+tasks_partitioning = """
+SELECT partitioned.partstrat, count(inherits.inhrelid),
+    EXISTS (SELECT 1 FROM pg_constraint WHERE conrelid = 'tasks'::regclass AND contype = 'p')
+FROM pg_class
+LEFT JOIN pg_partitioned_table AS partitioned ON partitioned.partrelid = pg_class.oid
+LEFT JOIN pg_inherits AS inherits ON inherits.inhparent = pg_class.oid
+WHERE pg_class.oid = 'tasks'::regclass
+GROUP BY partitioned.partstrat;
+"""
+
+# Секціонована копія tasks. Первинний ключ секціонованої таблиці мусить містити
+# ключ секціонування, тому він складається з id і стовпця ключа, а той стає
+# NOT NULL. Так (id, ключ) унікальна в усіх секціях, а пошук за id іде по
+# первинному ключу; id, заданий явно, унікальний лише в межах свого ключа
+create_partitioned_tasks_table = """
+CREATE TABLE tasks_partitioned (
+    id INTEGER NOT NULL DEFAULT nextval('tasks_id_seq'),
+    title VARCHAR(100) NOT NULL,
+    description TEXT,
+    status_id INTEGER REFERENCES status(id),
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    CONSTRAINT tasks_partitioned_pkey PRIMARY KEY (id, {key})
+) PARTITION BY {method};
+"""
+
+# Переносимо дані й замінюємо таблицю. Тригери лічильників з'являються лише
+# після копіювання, тому лічильники лишаються незмінними
+swap_partitioned_tasks = """
+INSERT INTO tasks_partitioned (id, title, description, status_id, user_id)
+SELECT id, title, description, status_id, user_id FROM tasks;
+ALTER SEQUENCE tasks_id_seq OWNED BY tasks_partitioned.id;
+DROP TABLE tasks;
+ALTER TABLE tasks_partitioned RENAME TO tasks;
+ALTER TABLE tasks RENAME CONSTRAINT tasks_partitioned_status_id_fkey TO tasks_status_id_fkey;
+ALTER TABLE tasks RENAME CONSTRAINT tasks_partitioned_user_id_fkey TO tasks_user_id_fkey;
+ALTER TABLE tasks RENAME CONSTRAINT tasks_partitioned_pkey TO tasks_pkey;
+"""
+
+# Таблиця з версіями застосованих міграцій
+create_migrations_table = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+"""
+
+# Міграції схеми у порядку застосування: (версія, опис, SQL-запити).
+# Нові зміни схеми додаються лише в кінець списку з наступною версією
+MIGRATIONS = [
+    (1, "базова схема", [create_users_table, create_status_table, insert_statuses, create_tasks_table]),
+    (2, "індекси для запитів query.py", [
+        create_tasks_indexes, create_incomplete_tasks_index, create_email_trgm_index,
+    ]),
+    (3, "лічильники завдань за статусами та користувачами", [
+        create_task_counters, create_task_counter_functions, create_task_counter_triggers,
+        rebuild_task_counters,
+    ]),
+    (4, "покривний індекс для завдань без опису", [replace_tasks_without_description_index]),
+    (5, "домен email та індекси для пошуку за email", [add_email_domain]),
+]
+
+
+@contextlib.contextmanager
+def deferred_task_counters(cur):
+    """Вимикає підтримку лічильників завдань для сеансу cur на час блоку.
+
+    Інші сеанси її не втрачають і нічого не блокується, тож так можуть
+    завантажувати дані кілька процесів одночасно. Після завантаження
+    лічильники треба перерахувати через rebuild_task_counters.
+    """
+    cur.execute("SET task_counts.deferred = on;")
+    try:
+        yield
+    finally:
+        # Невдалу транзакцію все одно буде відкочено; SET, зафіксований раніше
+        # (наприклад, разом з першою порцією COPY), треба скинути, інакше
+        # підключення повернеться в пул з вимкненими лічильниками
+        if cur.connection.get_transaction_status() == extensions.TRANSACTION_STATUS_INERROR:
+            cur.connection.rollback()
+        cur.execute("RESET task_counts.deferred;")
+
+
+def applied_versions(cur):
+    """Повертає множину версій міграцій, які вже застосовано."""
+    cur.execute(create_migrations_table)
+    cur.execute("SELECT version FROM schema_migrations;")
+    return {row[0] for row in cur.fetchall()}
+
+
+def migrate(conn):
+    """Застосовує всі незастосовані міграції, кожну в окремій транзакції."""
+    applied = []
+    with conn.cursor() as cur:
+        done = applied_versions(cur)
+        conn.commit()
+        for version, description, statements in MIGRATIONS:
+            if version in done:
+                continue
+            for statement in statements:
+                cur.execute(statement)
+            cur.execute(
+                "INSERT INTO schema_migrations (version, description) VALUES (%s, %s);",
+                (version, description),
+            )
+            conn.commit()
+            applied.append(version)
+    return applied
+
+
+def create_partitions(cur, partition_by, hash_partitions):
+    """Створює секції tasks_partitioned: по одній на статус або hash_partitions за user_id.
+
+    Повертає суфікси назв секцій; до заміни таблиці вони мають префікс
+    tasks_partitioned_, щоб не збігтися із секціями поточної tasks.
+    """
+    if partition_by == "status":
+        cur.execute("SELECT id FROM status ORDER BY id;")
+        bounds = {
+            f"status_{status_id}": f"FOR VALUES IN ({status_id})" for (status_id,) in cur.fetchall()
+        }
+        # Завдання з новими статусами
+        bounds["status_default"] = "DEFAULT"
+    else:
+        bounds = {
+            f"user_{remainder}": f"FOR VALUES WITH (MODULUS {hash_partitions}, REMAINDER {remainder})"
+            for remainder in range(hash_partitions)
+        }
+    for suffix, bound in bounds.items():
+        cur.execute(f"CREATE TABLE tasks_partitioned_{suffix} PARTITION OF tasks_partitioned {bound};")
+    return list(bounds)
+
+
+def partition_tasks(conn, partition_by, hash_partitions=tasks_hash_partitions):
+    """Перетворює tasks на секціоновану таблицю разом з наявними даними.
+
+    Усе відбувається в одній транзакції під ексклюзивним блокуванням tasks.
+    Індекси та тригери лічильників створюються заново на секціонованій таблиці.
+    Завдання без значення ключа секціонування спричиняють ValueError.
+    Повертає False, якщо tasks уже секціоновано так само.
+    """
+    if partition_by not in PARTITION_STRATEGIES:
+        raise ValueError(f"unknown partitioning: {partition_by!r}")
+    with conn.cursor() as cur:
+        cur.execute(tasks_partitioning)
+        strategy, partitions, has_primary_key = cur.fetchone()
+        if strategy == PARTITION_STRATEGIES[partition_by] and has_primary_key and (
+            partition_by == "status" or partitions == hash_partitions
+        ):
+            return False
+        key = PARTITION_KEYS[partition_by]
+        cur.execute("LOCK TABLE tasks IN ACCESS EXCLUSIVE MODE;")
+        cur.execute(f"SELECT count(*) FROM tasks WHERE {key} IS NULL;")
+        missing = cur.fetchone()[0]
+        if missing:
+            raise ValueError(f"{missing} tasks have no {key}; it is part of the partitioned primary key")
+        method = "LIST (status_id)" if partition_by == "status" else "HASH (user_id)"
+        cur.execute(create_partitioned_tasks_table.format(key=key, method=method))
+        suffixes = create_partitions(cur, partition_by, hash_partitions)
+        cur.execute(swap_partitioned_tasks)
+        for suffix in suffixes:
+            cur.execute(f"ALTER TABLE tasks_partitioned_{suffix} RENAME TO tasks_{suffix};")
+        for statement in (
+            create_tasks_indexes, create_incomplete_tasks_index,
+            replace_tasks_without_description_index, create_task_counter_triggers,
+        ):
+            cur.execute(statement)
+        cur.execute("ANALYZE tasks;")
+    conn.commit()
+    return True
+
+
+def init_database(partition_by=tasks_partition_by, hash_partitions=tasks_hash_partitions):
+    """Створює або оновлює схему бази даних до останньої версії.
+
+    З partition_by ('status' або 'user') таблиця tasks, нова чи вже заповнена,
+    перетворюється на секціоновану.
+    """
+    with connection() as conn:
+        applied = migrate(conn)
+        partitioned = partition_by and partition_tasks(conn, partition_by, hash_partitions)
+    # Міграції могли змінити таблицю status
+    statuses.invalidate()
+    for version in applied:
+        print(f"Застосовано міграцію {version}")
+    if partitioned:
+        print(f"Таблицю tasks секціоновано за {partition_by}")
+    print("Ініціалізація бази даних завершена успішно.")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Створення та оновлення схеми бази даних")
+    parser.add_argument("--partition-by", choices=list(PARTITION_STRATEGIES),
+                        default=tasks_partition_by or None,
+                        help="секціонувати tasks за статусом (список) або користувачем (хеш)")
+    parser.add_argument("--partitions", type=int, default=tasks_hash_partitions,
+                        help="кількість хеш-секцій для --partition-by user")
+    return parser.parse_args(argv)
 
-# Закриваємо курсор і підключення
-cur.close()
-conn.close()
 
-print("Ініціалізація бази даних завершена успішно.")
+if __name__ == "__main__":
+    args = parse_args()
+    init_database(args.partition_by, args.partitions)
@@ -0,0 +1,219 @@
+import bisect
+import contextvars
+import functools
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+from psycopg2.extensions import cursor as _cursor
+
+# Set POSTGRES_INSTRUMENT=0 to skip the per-query bookkeeping entirely
+instrument_enabled = os.getenv("POSTGRES_INSTRUMENT", "1") != "0"
+slow_query_ms = float(os.getenv("POSTGRES_SLOW_QUERY_MS", "200"))
+# EXPLAIN (ANALYZE, BUFFERS) re-runs the statement, so it is only done for reads
+slow_query_explain = os.getenv("POSTGRES_SLOW_QUERY_EXPLAIN", "0") == "1"
+
+slow_log = logging.getLogger("task_1.slow_queries")
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Modules whose frames are skipped when looking for the query function that ran a statement
+_HELPER_MODULES = {__name__, "prepared", "db", "contextlib", "psycopg2.extras"}
+
+# Connection checkout wait, attributed to the first statement run after the checkout
+_checkout_wait = contextvars.ContextVar("checkout_wait", default=0.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram in milliseconds."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the pct-th percentile (max for the last bucket)."""
+        if not self.count:
+            return 0.0
+        rank = self.count * pct / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(BUCKETS_MS[index], self.max) if index < len(BUCKETS_MS) else self.max
+        return self.max
+
+
+class QueryStats:
+    """Per-function execution and connection-wait histograms plus row counts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._functions = {}
+
+    def record(self, function, fingerprint, params, rows, wait_ms, exec_ms, prepare=False):
+        with self._lock:
+            stats = self._functions.get(function)
+            if stats is None:
+                stats = self._functions[function] = {
+                    "fingerprints": set(), "params": 0, "rows": 0, "prepare_ms": 0.0,
+                    "exec": Histogram(), "wait": Histogram(),
+                }
+            if prepare:
+                # A PREPARE is setup for the EXECUTE that follows, not a call of its own
+                stats["prepare_ms"] += exec_ms
+                return
+            stats["fingerprints"].add(fingerprint)
+            stats["params"] = max(stats["params"], params)
+            stats["rows"] += max(rows, 0)
+            stats["exec"].observe(exec_ms)
+            stats["wait"].observe(wait_ms)
+
+    def reset(self):
+        with self._lock:
+            self._functions.clear()
+
+    def summary(self):
+        """Return one row per function, slowest total execution time first."""
+        with self._lock:
+            rows = [
+                {
+                    "function": function,
+                    "calls": s["exec"].count,
+                    "rows": s["rows"],
+                    "params": s["params"],
+                    "statements": len(s["fingerprints"]),
+                    "wait_ms_total": round(s["wait"].total, 3),
+                    "exec_ms_total": round(s["exec"].total, 3),
+                    "exec_ms_p50": s["exec"].percentile(50),
+                    "exec_ms_p95": s["exec"].percentile(95),
+                    "exec_ms_p99": s["exec"].percentile(99),
+                    "exec_ms_max": round(s["exec"].max, 3),
+                    "prepare_ms_total": round(s["prepare_ms"], 3),
+                }
+                for function, s in self._functions.items()
+            ]
+        return sorted(rows, key=lambda row: row["exec_ms_total"], reverse=True)
+
+
+stats = QueryStats()
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(sql):
+    """Short stable hash of a statement with whitespace normalized."""
+    if isinstance(sql, bytes):
+        sql = sql.decode()
+    return hashlib.sha1(" ".join(str(sql).split()).encode()).hexdigest()[:12]
+
+
+def note_checkout_wait(seconds):
+    """Called by db.connection() with the time spent waiting for a pooled connection."""
+    _checkout_wait.set(seconds)
+
+
+def _is_prepare(query):
+    """Whether a statement is a PREPARE, as sent by prepared.PreparedRegistry."""
+    if isinstance(query, bytes):
+        return query[:8].upper() == b"PREPARE "
+    return isinstance(query, str) and query[:8].upper() == "PREPARE "
+
+
+def _query_text(query, cur):
+    """Return a statement as text, whether it is a str, bytes or a psycopg2.sql object."""
+    if isinstance(query, bytes):
+        return query.decode(errors="replace")
+    if hasattr(query, "as_string"):
+        return query.as_string(cur)
+    return str(query)
+
+
+def _caller():
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_globals.get("__name__") in _HELPER_MODULES:
+        frame = frame.f_back
+    return frame.f_code.co_name if frame is not None else "?"
+
+
+class InstrumentedCursor(_cursor):
+    """Cursor that records every execute() into `stats` and the slow-query log."""
+
+    def execute(self, query, vars=None):
+        if not instrument_enabled or self.name is not None:
+            return super().execute(query, vars)
+        # The checkout wait goes to the EXECUTE that follows a PREPARE
+        prepare = _is_prepare(query)
+        wait = 0.0 if prepare else _checkout_wait.get()
+        if wait:
+            _checkout_wait.set(0.0)
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            exec_ms = (time.perf_counter() - started) * 1000
+            function = _caller()
+            params = len(vars) if vars else 0
+            stats.record(
+                function, fingerprint(query), params, self.rowcount, wait * 1000, exec_ms, prepare
+            )
+            if exec_ms >= slow_query_ms:
+                self._log_slow(function, query, vars, params, wait * 1000, exec_ms)
+
+    def _log_slow(self, function, query, vars, params, wait_ms, exec_ms):
+        text = _query_text(query, self)
+        record = {
+            "function": function,
+            "fingerprint": fingerprint(query),
+            "params": params,
+            "rows": self.rowcount,
+            "wait_ms": round(wait_ms, 3),
+            "exec_ms": round(exec_ms, 3),
+            "sql": " ".join(text.split()),
+        }
+        # A savepoint keeps a failed EXPLAIN from aborting the caller's transaction;
+        # in autocommit mode there is no transaction to hold one, so no plan is taken
+        if (
+            slow_query_explain
+            and not self.connection.autocommit
+            and (self.statusmessage or "").startswith("SELECT")
+        ):
+            with self.connection.cursor(cursor_factory=_cursor) as cur:
+                saved = False
+                try:
+                    cur.execute("SAVEPOINT slow_query_explain;")
+                    saved = True
+                    cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + text, vars)
+                    record["plan"] = cur.fetchone()[0]
+                    cur.execute("RELEASE SAVEPOINT slow_query_explain;")
+                except Exception as err:  # the plan is best-effort diagnostics
+                    if saved:
+                        cur.execute("ROLLBACK TO SAVEPOINT slow_query_explain;")
+                    record["plan_error"] = str(err)
+        slow_log.warning(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def report():
+    """Return the per-function summary as text for the end of a run."""
+    rows = stats.summary()
+    if not rows:
+        return "No queries recorded.\n"
+    columns = list(rows[0])
+    widths = {c: max(len(c), *(len(str(row[c])) for row in rows)) for c in columns}
+    lines = ["  ".join(c.rjust(widths[c]) for c in columns)]
+    lines += ["  ".join(str(row[c]).rjust(widths[c]) for c in columns) for row in rows]
+    return "\n".join(lines) + "\n"
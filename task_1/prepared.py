@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+import weakref
+
+from psycopg2 import errors, extensions
+
+# Set POSTGRES_PREPARED=0 to send plain SQL text instead of EXECUTE
+use_prepared = os.getenv("POSTGRES_PREPARED", "1") != "0"
+
+
+def to_positional(sql):
+    """Turn a psycopg2 statement with %s placeholders into PREPARE form with $1, $2, ..."""
+    parts = sql.strip().rstrip(";").split("%s")
+    return "".join(
+        part + (f"${n}" if n < len(parts) else "") for n, part in enumerate(parts, 1)
+    )
+
+
+class PreparedRegistry:
+    """Named statements that are PREPAREd once per connection and then EXECUTEd.
+
+    Each pooled connection remembers which statements its backend has prepared.
+    A connection replaced by the pool starts with an empty set, and a backend
+    that lost its prepared statements is detected and re-prepared once.
+    """
+
+    def __init__(self, enabled=use_prepared):
+        self.enabled = enabled
+        self._statements = {}
+        self._prepared = weakref.WeakKeyDictionary()  # connection -> set of names
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def register(self, name, sql):
+        """Register a statement under a name; returns the name for convenience."""
+        self._statements[name] = sql
+        self._stats[name] = {"calls": 0, "prepares": 0, "total_s": 0.0, "max_s": 0.0}
+        return name
+
+    def execute(self, cur, name, params=()):
+        """Execute a registered statement on the cursor, preparing it first if needed.
+
+        If the backend lost the statement and the call started the transaction,
+        the aborted transaction is rolled back and the call retried. Later in a
+        transaction the error is raised instead, since a rollback would discard
+        the caller's earlier work; the next call prepares the statement again.
+        """
+        started = time.perf_counter()
+        if not self.enabled:
+            cur.execute(self._statements[name], params or None)
+        else:
+            starts_transaction = (
+                cur.connection.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE
+            )
+            try:
+                self._execute_prepared(cur, name, params)
+            except errors.InvalidSqlStatementName:
+                # The backend dropped its prepared statements (e.g. DISCARD ALL)
+                self._prepared.pop(cur.connection, None)
+                if not starts_transaction:
+                    raise
+                cur.connection.rollback()
+                self._execute_prepared(cur, name, params)
+        self._record(name, time.perf_counter() - started)
+
+    def stats(self):
+        """Return per-statement call counts, prepares and timings in milliseconds."""
+        with self._lock:
+            return {
+                name: {
+                    "calls": s["calls"],
+                    "prepares": s["prepares"],
+                    "avg_ms": s["total_s"] / s["calls"] * 1000 if s["calls"] else 0.0,
+                    "max_ms": s["max_s"] * 1000,
+                }
+                for name, s in self._stats.items()
+            }
+
+    def prepare(self, cur, name):
+        """PREPARE a registered statement on the cursor's connection unless it already is."""
+        prepared = self._prepared.setdefault(cur.connection, set())
+        if name not in prepared:
+            cur.execute(f"PREPARE {name} AS {to_positional(self._statements[name])};")
+            prepared.add(name)
+            with self._lock:
+                self._stats[name]["prepares"] += 1
+
+    def _execute_prepared(self, cur, name, params):
+        self.prepare(cur, name)
+        if params:
+            placeholders = ", ".join(["%s"] * len(params))
+            cur.execute(f"EXECUTE {name} ({placeholders});", params)
+        else:
+            cur.execute(f"EXECUTE {name};")
+
+    def _record(self, name, elapsed):
+        with self._lock:
+            s = self._stats[name]
+            s["calls"] += 1
+            s["total_s"] += elapsed
+            s["max_s"] = max(s["max_s"], elapsed)
+
+
+registry = PreparedRegistry()
@@ -0,0 +1,57 @@
+"""pytest fixtures around reset.py.
+
+Enable with `pytest -p pytest_reset` or `pytest_plugins = ["pytest_reset"]` in
+a conftest.py. The template is built once per session (and reused between
+sessions while it is up to date); tests then either get their own clone of it
+or share one clone and roll back after each test.
+"""
+import pytest
+
+import reset
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("reset", "database reset")
+    group.addoption("--reset-users", type=int, default=20, help="users in the template database")
+    group.addoption("--reset-tasks", type=int, default=50, help="tasks in the template database")
+    group.addoption("--reset-seed", type=int, default=0, help="seed of the template data")
+    group.addoption("--reset-rebuild", action="store_true",
+                    help="rebuild the template database even if it is up to date")
+
+
+@pytest.fixture(scope="session")
+def template_database(request):
+    """Name of the seeded template database, built on first use."""
+    option = request.config.option
+    reset.build_template(
+        option.reset_users, option.reset_tasks, option.reset_seed, rebuild=option.reset_rebuild
+    )
+    return reset.template_db
+
+
+@pytest.fixture(scope="session")
+def shared_database(template_database):
+    """One clone for the whole session, for tests that roll back with db_rollback."""
+    with reset.cloned_database(template_database) as name:
+        yield name
+
+
+@pytest.fixture(scope="module")
+def module_database(template_database):
+    """A clone shared by the tests of one module and dropped after them."""
+    with reset.cloned_database(template_database) as name:
+        yield name
+
+
+@pytest.fixture
+def fresh_database(template_database):
+    """A clone for a single test, for code that commits or changes the schema."""
+    with reset.cloned_database(template_database) as name:
+        yield name
+
+
+@pytest.fixture
+def db_rollback(shared_database):
+    """Run the test on one connection to the shared clone and undo its writes afterwards."""
+    with reset.rollback_after() as conn:
+        yield conn
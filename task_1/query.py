@@ -1,254 +1,730 @@
-import psycopg2
-import pandas as pd
+import argparse
+import functools
 import io
-import os
-
-# Get connection parameters from environment variables or use default values
-db_host = os.getenv("POSTGRES_HOST", "localhost")
-db_name = os.getenv("POSTGRES_DB", "hw03")
-db_user = os.getenv("POSTGRES_USER", "postgres")
-db_password = os.getenv("POSTGRES_PASSWORD", "postgres")
-
-
-def get_connection():
-    """Establish a connection to the PostgreSQL database."""
-    return psycopg2.connect(
-        host=db_host, database=db_name, user=db_user, password=db_password
-    )
+import itertools
+import sys
+import time
+
+from psycopg2 import errors
+from psycopg2.extras import execute_values
+
+import instrument
+from cache import read_cache
+from db import connection, get_pool
+from prepared import registry
+from statuses import status_id
+
+# SQL of every query function, kept at module level so that tooling
+# (e.g. check_plans.py) can inspect the exact statements that run.
+
+USER_BY_TASK_ID_SQL = """
+    SELECT users.id, users.fullname, users.email
+    FROM tasks
+    JOIN users ON tasks.user_id = users.id
+    WHERE tasks.id = %s;
+"""
+
+TASKS_BY_USER_SQL = """
+    SELECT tasks.id, tasks.title, tasks.description, status.name AS status
+    FROM tasks
+    JOIN status ON tasks.status_id = status.id
+    WHERE tasks.user_id = %s;
+"""
+
+TASKS_BY_STATUS_SQL = """
+    SELECT tasks.id, tasks.title, tasks.description, status.name AS status
+    FROM tasks
+    JOIN status ON tasks.status_id = status.id
+    WHERE tasks.status_id = %s;
+"""
+
+UPDATE_TASK_STATUS_SQL = """
+    UPDATE tasks
+    SET status_id = %s
+    WHERE id = %s
+    RETURNING user_id;
+"""
+
+# NOT EXISTS is an anti-join on tasks_user_id_idx and, unlike NOT IN,
+# still finds users when some tasks.user_id is NULL
+USERS_WITHOUT_TASKS_SQL = """
+    SELECT id, fullname, email
+    FROM users
+    WHERE NOT EXISTS (SELECT 1 FROM tasks WHERE tasks.user_id = users.id);
+"""
+
+ADD_TASK_SQL = """
+    INSERT INTO tasks (title, description, status_id, user_id)
+    VALUES (%s, %s, %s, %s);
+"""
+
+INCOMPLETE_TASKS_SQL = """
+    SELECT tasks.id, tasks.title, tasks.description, status.name AS status
+    FROM tasks
+    JOIN status ON tasks.status_id = status.id
+    WHERE tasks.status_id <> %s;
+"""
+
+DELETE_TASK_SQL = """
+    DELETE FROM tasks
+    WHERE id = %s
+    RETURNING user_id;
+"""
+
+USERS_BY_EMAIL_PATTERN_SQL = """
+    SELECT id, fullname, email
+    FROM users
+    WHERE email LIKE %s;
+"""
+
+# Patterns that find_users_by_email_pattern routes to a narrower index
+USERS_BY_EMAIL_SQL = """
+    SELECT id, fullname, email
+    FROM users
+    WHERE email = %s;
+"""
+
+USERS_BY_EMAIL_DOMAIN_PATTERN_SQL = """
+    SELECT id, fullname, email
+    FROM users
+    WHERE email_domain = %s AND email LIKE %s;
+"""
+
+USERS_BY_DOMAIN_SQL = """
+    SELECT id, fullname, email
+    FROM users
+    WHERE email_domain = %s
+    ORDER BY id;
+"""
+
+UPDATE_USER_FULLNAME_SQL = """
+    UPDATE users
+    SET fullname = %s
+    WHERE id = %s;
+"""
+
+TASK_COUNT_BY_STATUS_SQL = """
+    SELECT status.name AS status, task_counts_by_status.task_count
+    FROM task_counts_by_status
+    JOIN status ON task_counts_by_status.status_id = status.id
+    WHERE task_counts_by_status.task_count > 0;
+"""
+
+TASKS_FOR_EMAIL_DOMAIN_SQL = """
+    SELECT tasks.id, tasks.title, tasks.description, users.fullname, users.email, status.name AS status
+    FROM tasks
+    JOIN users ON tasks.user_id = users.id
+    JOIN status ON tasks.status_id = status.id
+    WHERE users.email_domain = %s;
+"""
+
+# A single predicate that matches the covering partial index tasks_without_description_idx
+TASKS_WITHOUT_DESCRIPTION_SQL = """
+    SELECT id, title, user_id, status_id
+    FROM tasks
+    WHERE COALESCE(description, '') = '';
+"""
+
+USERS_WITH_TASKS_IN_PROGRESS_SQL = """
+    SELECT users.id AS user_id, users.fullname, tasks.id AS task_id, tasks.title, tasks.description, status.name AS status
+    FROM tasks
+    INNER JOIN users ON tasks.user_id = users.id
+    INNER JOIN status ON tasks.status_id = status.id
+    WHERE tasks.status_id = %s;
+"""
+
+USERS_AND_TASK_COUNT_SQL = """
+    SELECT users.id AS user_id, users.fullname, users.email,
+           COALESCE(task_counts_by_user.task_count, 0) AS task_count
+    FROM users
+    LEFT JOIN task_counts_by_user ON users.id = task_counts_by_user.user_id;
+"""
+
+# Keyset-paginated variants of the list queries: rows with id > after_id, ordered by id
+
+TASKS_BY_STATUS_PAGE_SQL = """
+    SELECT tasks.id, tasks.title, tasks.description, status.name AS status
+    FROM tasks
+    JOIN status ON tasks.status_id = status.id
+    WHERE tasks.status_id = %s AND tasks.id > %s
+    ORDER BY tasks.id
+    LIMIT %s;
+"""
+
+INCOMPLETE_TASKS_PAGE_SQL = """
+    SELECT tasks.id, tasks.title, tasks.description, status.name AS status
+    FROM tasks
+    JOIN status ON tasks.status_id = status.id
+    WHERE tasks.status_id <> %s AND tasks.id > %s
+    ORDER BY tasks.id
+    LIMIT %s;
+"""
+
+TASKS_FOR_EMAIL_DOMAIN_PAGE_SQL = """
+    SELECT tasks.id, tasks.title, tasks.description, users.fullname, users.email, status.name AS status
+    FROM tasks
+    JOIN users ON tasks.user_id = users.id
+    JOIN status ON tasks.status_id = status.id
+    WHERE users.email_domain = %s AND tasks.id > %s
+    ORDER BY tasks.id
+    LIMIT %s;
+"""
+
+USERS_BY_DOMAIN_PAGE_SQL = """
+    SELECT id, fullname, email
+    FROM users
+    WHERE email_domain = %s AND id > %s
+    ORDER BY id
+    LIMIT %s;
+"""
+
+USERS_AND_TASK_COUNT_PAGE_SQL = """
+    SELECT users.id AS user_id, users.fullname, users.email,
+           COALESCE(task_counts_by_user.task_count, 0) AS task_count
+    FROM users
+    LEFT JOIN task_counts_by_user ON users.id = task_counts_by_user.user_id
+    WHERE users.id > %s
+    ORDER BY users.id
+    LIMIT %s;
+"""
+
+# Statements the single-call functions run through the prepared-statement
+# registry, keyed by function name
+PREPARED_STATEMENTS = {
+    "get_user_by_task_id": USER_BY_TASK_ID_SQL,
+    "get_tasks_by_user": TASKS_BY_USER_SQL,
+    "get_tasks_by_status": TASKS_BY_STATUS_SQL,
+    "update_task_status": UPDATE_TASK_STATUS_SQL,
+    "get_users_without_tasks": USERS_WITHOUT_TASKS_SQL,
+    "add_new_task_for_user": ADD_TASK_SQL,
+    "get_incomplete_tasks": INCOMPLETE_TASKS_SQL,
+    "delete_task_by_id": DELETE_TASK_SQL,
+    "find_users_by_email_pattern": USERS_BY_EMAIL_PATTERN_SQL,
+    "find_users_by_email": USERS_BY_EMAIL_SQL,
+    "find_users_by_email_domain": USERS_BY_EMAIL_DOMAIN_PATTERN_SQL,
+    "get_users_by_domain": USERS_BY_DOMAIN_SQL,
+    "update_user_fullname": UPDATE_USER_FULLNAME_SQL,
+    "get_task_count_by_status": TASK_COUNT_BY_STATUS_SQL,
+    "get_tasks_for_users_with_email_domain": TASKS_FOR_EMAIL_DOMAIN_SQL,
+    "get_tasks_without_description": TASKS_WITHOUT_DESCRIPTION_SQL,
+    "get_users_with_tasks_in_progress": USERS_WITH_TASKS_IN_PROGRESS_SQL,
+    "get_users_and_task_count": USERS_AND_TASK_COUNT_SQL,
+    "get_tasks_by_status_page": TASKS_BY_STATUS_PAGE_SQL,
+    "get_incomplete_tasks_page": INCOMPLETE_TASKS_PAGE_SQL,
+    "get_tasks_for_users_with_email_domain_page": TASKS_FOR_EMAIL_DOMAIN_PAGE_SQL,
+    "get_users_by_domain_page": USERS_BY_DOMAIN_PAGE_SQL,
+    "get_users_and_task_count_page": USERS_AND_TASK_COUNT_PAGE_SQL,
+}
+for _name, _sql in PREPARED_STATEMENTS.items():
+    registry.register(_name, _sql)
+
+# Prepared forms of the incomplete-task statements, one per id of 'completed'
+_completed_statements = set()
+
+# Set-based statements of the batch write functions; execute_values expands VALUES %s
+
+ADD_TASKS_SQL = """
+    INSERT INTO tasks (title, description, status_id, user_id)
+    VALUES %s
+    RETURNING id;
+"""
+
+UPDATE_TASK_STATUSES_SQL = """
+    UPDATE tasks
+    SET status_id = v.status_id
+    FROM (VALUES %s) AS v (id, status_id)
+    WHERE tasks.id = v.id
+    RETURNING tasks.id, tasks.user_id;
+"""
+
+DELETE_TASKS_SQL = """
+    DELETE FROM tasks
+    WHERE id = ANY(%s)
+    RETURNING id, user_id;
+"""
+
+UPDATE_USER_FULLNAMES_SQL = """
+    UPDATE users
+    SET fullname = v.fullname
+    FROM (VALUES %s) AS v (id, fullname)
+    WHERE users.id = v.id
+    RETURNING users.id;
+"""
+
+# Rows sent per statement by the batch write functions
+DEFAULT_CHUNK_SIZE = 1000
+
+# Rows fetched per round trip by the server-side cursors of the iter_* functions
+DEFAULT_ITERSIZE = 2000
+
+
+def invalidate_task_reads(user_ids, task_count_changed=True):
+    """Drop cached reads affected by task writes of the given users."""
+    keys = [("get_tasks_by_user", (user_id,)) for user_id in set(user_ids)]
+    keys.append(("get_task_count_by_status", ()))
+    if task_count_changed:
+        keys.append(("get_users_and_task_count", ()))
+    read_cache.invalidate(*keys)
+
+
+def invalidate_user_reads():
+    """Drop cached reads that show user names."""
+    read_cache.invalidate(("get_users_and_task_count", ()))
+
+
+# Attempts of a write that races with a concurrent update moving its row to
+# another partition of a partitioned tasks table (see init.py)
+MOVED_ROW_ATTEMPTS = 3
+
+
+def retry_moved_rows(func):
+    """Retry a task write when Postgres reports that its row was moved concurrently.
+
+    An UPDATE of the partition key moves the row to another partition. A
+    concurrent UPDATE or DELETE of the same row then fails with a
+    serialization error instead of following it; running the write again
+    finds the row in its new partition.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(1, MOVED_ROW_ATTEMPTS + 1):
+            try:
+                return func(*args, **kwargs)
+            except errors.SerializationFailure:
+                if attempt == MOVED_ROW_ATTEMPTS:
+                    raise
+    return wrapper
+
+
+def with_completed_id(sql, completed_id):
+    """Return a statement with its first parameter, the id of 'completed', inlined as a literal.
+
+    tasks_incomplete_idx has that id as a constant in its predicate. A bound
+    parameter gets the index only in custom plans: the generic plan Postgres
+    switches to after five executions of a prepared statement cannot prove the
+    predicate and scans the whole table.
+    """
+    return sql.replace("%s", str(int(completed_id)), 1)
+
+
+def completed_statement(name, completed_id):
+    """Register the prepared form of `name` with the 'completed' id inlined; returns its name."""
+    statement = f"{name}_{completed_id}"
+    if statement not in _completed_statements:
+        registry.register(statement, with_completed_id(PREPARED_STATEMENTS[name], completed_id))
+        _completed_statements.add(statement)
+    return statement
+
+
+def normalize_domain(domain):
+    """Return a domain as stored in users.email_domain: lowercase, without a leading '@'."""
+    return domain.strip().lstrip("@").lower()
+
+
+def route_email_pattern(pattern):
+    """Pick the statement whose index serves a LIKE pattern best.
+
+    Returns (statement name, parameters). A pattern without wildcards is an
+    exact lookup on the unique email index, '%@domain' uses the email_domain
+    index with LIKE rechecking the exact case, and anything else runs as is on
+    the trigram (substring) or text_pattern_ops (prefix) index.
+    """
+    chars, wildcards, escaped = [], [], False
+    for char in pattern:
+        if escaped:
+            chars.append(char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        else:
+            if char in "%_":
+                wildcards.append(len(chars))
+            chars.append(char)
+    literal = "".join(chars)
+    if not wildcards and not escaped:
+        return "find_users_by_email", (literal,)
+    if wildcards == [0] and literal[:2] == "%@" and "@" not in literal[2:]:
+        return "find_users_by_email_domain", (normalize_domain(literal[2:]), pattern)
+    return "find_users_by_email_pattern", (pattern,)
 
 
 def get_user_by_task_id(task_id):
     """Retrieve the user assigned to a specific task."""
-    with get_connection() as conn:
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT users.id, users.fullname, users.email
-                FROM tasks
-                JOIN users ON tasks.user_id = users.id
-                WHERE tasks.id = %s;
-            """,
-                (task_id,),
-            )
+            registry.execute(cur, "get_user_by_task_id", (task_id,))
             return cur.fetchone()
 
 
+@read_cache.cached
 def get_tasks_by_user(user_id):
     """Retrieve all tasks assigned to a specific user."""
-    with get_connection() as conn:
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT tasks.id, tasks.title, tasks.description, status.name AS status
-                FROM tasks
-                JOIN status ON tasks.status_id = status.id
-                WHERE tasks.user_id = %s;
-            """,
-                (user_id,),
-            )
+            registry.execute(cur, "get_tasks_by_user", (user_id,))
             return cur.fetchall()
 
 
 def get_tasks_by_status(status_name):
     """Retrieve all tasks with a specific status."""
-    with get_connection() as conn:
+    params = (status_id(status_name),)
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT tasks.id, tasks.title, tasks.description, status.name AS status
-                FROM tasks
-                JOIN status ON tasks.status_id = status.id
-                WHERE tasks.status_id = (SELECT id FROM status WHERE name = %s);
-            """,
-                (status_name,),
-            )
+            registry.execute(cur, "get_tasks_by_status", params)
             return cur.fetchall()
 
 
+@retry_moved_rows
 def update_task_status(task_id, new_status_name):
     """Update the status of a specific task."""
-    with get_connection() as conn:
+    params = (status_id(new_status_name), task_id)
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                UPDATE tasks
-                SET status_id = (SELECT id FROM status WHERE name = %s)
-                WHERE id = %s;
-            """,
-                (new_status_name, task_id),
-            )
+            registry.execute(cur, "update_task_status", params)
+            updated = cur.fetchone()
             conn.commit()
+    if updated:
+        invalidate_task_reads([updated[0]], task_count_changed=False)
 
 
 def get_users_without_tasks():
     """Retrieve all users who do not have any tasks assigned."""
-    with get_connection() as conn:
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("""
-                SELECT id, fullname, email
-                FROM users
-                WHERE id NOT IN (SELECT user_id FROM tasks);
-            """)
+            registry.execute(cur, "get_users_without_tasks")
             return cur.fetchall()
 
 
 def add_new_task_for_user(title, description, status_name, user_id):
     """Add a new task for a specific user."""
-    with get_connection() as conn:
+    params = (title, description, status_id(status_name), user_id)
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                INSERT INTO tasks (title, description, status_id, user_id)
-                VALUES (%s, %s, (SELECT id FROM status WHERE name = %s), %s);
-            """,
-                (title, description, status_name, user_id),
-            )
+            registry.execute(cur, "add_new_task_for_user", params)
             conn.commit()
+    invalidate_task_reads([user_id])
 
 
 def get_incomplete_tasks():
     """Retrieve all tasks that are not marked as completed."""
-    with get_connection() as conn:
+    statement = completed_statement("get_incomplete_tasks", status_id("completed"))
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("""
-                SELECT tasks.id, tasks.title, tasks.description, status.name AS status
-                FROM tasks
-                JOIN status ON tasks.status_id = status.id
-                WHERE status.name != 'completed';
-            """)
+            registry.execute(cur, statement)
             return cur.fetchall()
 
 
+@retry_moved_rows
 def delete_task_by_id(task_id):
     """Delete a specific task by its ID."""
-    with get_connection() as conn:
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                DELETE FROM tasks
-                WHERE id = %s;
-            """,
-                (task_id,),
-            )
+            registry.execute(cur, "delete_task_by_id", (task_id,))
+            deleted = cur.fetchone()
             conn.commit()
+    if deleted:
+        invalidate_task_reads([deleted[0]])
 
 
 def find_users_by_email_pattern(email_pattern):
     """Find users whose email matches a specific pattern."""
-    with get_connection() as conn:
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT id, fullname, email
-                FROM users
-                WHERE email LIKE %s;
-            """,
-                (email_pattern,),
-            )
+            registry.execute(cur, *route_email_pattern(email_pattern))
+            return cur.fetchall()
+
+
+def get_users_by_domain(domain):
+    """Retrieve users whose email domain is `domain`, case-insensitively."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            registry.execute(cur, "get_users_by_domain", (normalize_domain(domain),))
             return cur.fetchall()
 
 
 def update_user_fullname(user_id, new_fullname):
     """Update the fullname of a specific user."""
-    with get_connection() as conn:
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                UPDATE users
-                SET fullname = %s
-                WHERE id = %s;
-            """,
-                (new_fullname, user_id),
-            )
+            registry.execute(cur, "update_user_fullname", (new_fullname, user_id))
             conn.commit()
+    invalidate_user_reads()
 
 
+@read_cache.cached
 def get_task_count_by_status():
     """Retrieve the count of tasks for each status."""
-    with get_connection() as conn:
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("""
-                SELECT status.name AS status, COUNT(tasks.id) AS task_count
-                FROM tasks
-                JOIN status ON tasks.status_id = status.id
-                GROUP BY status.name;
-            """)
+            registry.execute(cur, "get_task_count_by_status")
             return cur.fetchall()
 
 
 def get_tasks_for_users_with_email_domain(domain):
     """Retrieve tasks assigned to users with a specific email domain."""
-    with get_connection() as conn:
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT tasks.id, tasks.title, tasks.description, users.fullname, users.email, status.name AS status
-                FROM tasks
-                JOIN users ON tasks.user_id = users.id
-                JOIN status ON tasks.status_id = status.id
-                WHERE users.email LIKE %s;
-            """,
-                (f"%{domain}",),
+            registry.execute(
+                cur, "get_tasks_for_users_with_email_domain", (normalize_domain(domain),)
             )
             return cur.fetchall()
 
 
 def get_tasks_without_description():
     """Retrieve all tasks that do not have a description."""
-    with get_connection() as conn:
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("""
-                SELECT id, title, user_id, status_id
-                FROM tasks
-                WHERE description IS NULL OR description = '';
-            """)
+            registry.execute(cur, "get_tasks_without_description")
             return cur.fetchall()
 
 
 def get_users_with_tasks_in_progress():
     """Retrieve users and their tasks that are marked as 'in progress'."""
-    with get_connection() as conn:
+    params = (status_id("in progress"),)
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("""
-                SELECT users.id AS user_id, users.fullname, tasks.id AS task_id, tasks.title, tasks.description, status.name AS status
-                FROM tasks
-                INNER JOIN users ON tasks.user_id = users.id
-                INNER JOIN status ON tasks.status_id = status.id
-                WHERE status.name = 'in progress';
-            """)
+            registry.execute(cur, "get_users_with_tasks_in_progress", params)
             return cur.fetchall()
 
 
+@read_cache.cached
 def get_users_and_task_count():
     """Retrieve users and the count of their tasks."""
-    with get_connection() as conn:
+    with connection() as conn:
+        with conn.cursor() as cur:
+            registry.execute(cur, "get_users_and_task_count")
+            return cur.fetchall()
+
+
+def chunked(iterable, size):
+    """Yield lists of up to `size` items from an iterable."""
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def _update_by_id(cur, sql, pairs, chunk_size):
+    """Run an UPDATE ... FROM (VALUES ...) per chunk.
+
+    Returns whether each pair matched a row, and all RETURNING rows.
+    """
+    results = []
+    returned = []
+    for chunk in chunked(pairs, chunk_size):
+        # One row per id: with duplicates UPDATE ... FROM applies an arbitrary one
+        latest = dict(chunk)
+        rows = execute_values(cur, sql, list(latest.items()), page_size=len(latest), fetch=True)
+        updated = {row[0] for row in rows}
+        results.extend(key in updated for key, _ in chunk)
+        returned.extend(rows)
+    return results, returned
+
+
+def add_new_tasks(tasks, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Add many (title, description, status_name, user_id) tasks in one transaction.
+
+    Returns the new task ids in input order.
+    """
+    # Status ids are resolved before a connection is held: a cache miss checks out another one
+    rows = [
+        (title, description, status_id(status_name), user_id)
+        for title, description, status_name, user_id in tasks
+    ]
+    ids = []
+    user_ids = set()
+    with connection() as conn:
+        with conn.cursor() as cur:
+            for chunk in chunked(rows, chunk_size):
+                ids.extend(row[0] for row in execute_values(
+                    cur, ADD_TASKS_SQL, chunk, page_size=len(chunk), fetch=True
+                ))
+                user_ids.update(row[3] for row in chunk)
+    invalidate_task_reads(user_ids)
+    return ids
+
+
+def update_task_statuses(updates, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Apply many (task_id, new_status_name) updates in one transaction.
+
+    Returns, in input order, whether each task existed and was updated.
+    """
+    # A retry runs the whole transaction again, so the input is read into a list once
+    pairs = [(task_id, status_id(name)) for task_id, name in updates]
+    results, rows = _update_task_statuses(pairs, chunk_size)
+    invalidate_task_reads((user_id for _, user_id in rows), task_count_changed=False)
+    return results
+
+
+@retry_moved_rows
+def _update_task_statuses(pairs, chunk_size):
+    """Update statuses per chunk; returns the matches and RETURNING rows as _update_by_id does."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            return _update_by_id(cur, UPDATE_TASK_STATUSES_SQL, pairs, chunk_size)
+
+
+def delete_tasks_by_ids(task_ids, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Delete many tasks by id in one transaction.
+
+    Returns, in input order, whether each task existed and was deleted.
+    """
+    results, user_ids = _delete_tasks_by_ids(list(task_ids), chunk_size)
+    invalidate_task_reads(user_ids)
+    return results
+
+
+@retry_moved_rows
+def _delete_tasks_by_ids(task_ids, chunk_size):
+    """Delete tasks per chunk; returns whether each existed and the owners of the deleted ones."""
+    results = []
+    user_ids = set()
+    with connection() as conn:
+        with conn.cursor() as cur:
+            for chunk in chunked(task_ids, chunk_size):
+                cur.execute(DELETE_TASKS_SQL, (chunk,))
+                rows = cur.fetchall()
+                deleted = {row[0] for row in rows}
+                results.extend(task_id in deleted for task_id in chunk)
+                user_ids.update(row[1] for row in rows)
+    return results, user_ids
+
+
+def update_user_fullnames(updates, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Apply many (user_id, new_fullname) updates in one transaction.
+
+    Returns, in input order, whether each user existed and was updated.
+    """
+    with connection() as conn:
+        with conn.cursor() as cur:
+            results, _ = _update_by_id(cur, UPDATE_USER_FULLNAMES_SQL, updates, chunk_size)
+    invalidate_user_reads()
+    return results
+
+
+_cursor_names = itertools.count(1)
+
+
+def iter_query(sql, params=None, itersize=DEFAULT_ITERSIZE):
+    """Stream rows of a query through a named server-side cursor.
+
+    Only `itersize` rows are held in memory at a time. The pooled connection
+    stays checked out until the generator is exhausted or closed.
+    """
+    with connection() as conn:
+        with conn.cursor(name=f"stream_{next(_cursor_names)}") as cur:
+            cur.itersize = itersize
+            cur.execute(sql, params)
+            yield from cur
+
+
+def iter_tasks_by_status(status_name, itersize=DEFAULT_ITERSIZE):
+    """Stream all tasks with a specific status."""
+    return iter_query(TASKS_BY_STATUS_SQL, (status_id(status_name),), itersize)
+
+
+def iter_incomplete_tasks(itersize=DEFAULT_ITERSIZE):
+    """Stream all tasks that are not marked as completed."""
+    return iter_query(INCOMPLETE_TASKS_SQL, (status_id("completed"),), itersize)
+
+
+def iter_tasks_for_users_with_email_domain(domain, itersize=DEFAULT_ITERSIZE):
+    """Stream tasks assigned to users with a specific email domain."""
+    return iter_query(TASKS_FOR_EMAIL_DOMAIN_SQL, (normalize_domain(domain),), itersize)
+
+
+def iter_users_and_task_count(itersize=DEFAULT_ITERSIZE):
+    """Stream users and the count of their tasks."""
+    return iter_query(USERS_AND_TASK_COUNT_SQL, itersize=itersize)
+
+
+def get_tasks_by_status_page(status_name, after_id=0, limit=100):
+    """Retrieve up to `limit` tasks with a specific status and id greater than `after_id`."""
+    params = (status_id(status_name), after_id, limit)
+    with connection() as conn:
+        with conn.cursor() as cur:
+            registry.execute(cur, "get_tasks_by_status_page", params)
+            return cur.fetchall()
+
+
+def get_incomplete_tasks_page(after_id=0, limit=100):
+    """Retrieve up to `limit` incomplete tasks with id greater than `after_id`."""
+    statement = completed_statement("get_incomplete_tasks_page", status_id("completed"))
+    with connection() as conn:
+        with conn.cursor() as cur:
+            registry.execute(cur, statement, (after_id, limit))
+            return cur.fetchall()
+
+
+def get_tasks_for_users_with_email_domain_page(domain, after_id=0, limit=100):
+    """Retrieve up to `limit` tasks of users with an email domain and id greater than `after_id`."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            registry.execute(
+                cur, "get_tasks_for_users_with_email_domain_page",
+                (normalize_domain(domain), after_id, limit),
+            )
+            return cur.fetchall()
+
+
+def get_users_by_domain_page(domain, after_id=0, limit=100):
+    """Retrieve up to `limit` users with an email domain and id greater than `after_id`."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            registry.execute(
+                cur, "get_users_by_domain_page", (normalize_domain(domain), after_id, limit)
+            )
+            return cur.fetchall()
+
+
+def get_users_and_task_count_page(after_id=0, limit=100):
+    """Retrieve up to `limit` users with their task count and id greater than `after_id`."""
+    with connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("""
-                SELECT users.id AS user_id, users.fullname, users.email, COUNT(tasks.id) AS task_count
-                FROM users
-                LEFT JOIN tasks ON users.id = tasks.user_id
-                GROUP BY users.id, users.fullname, users.email;
-            """)
+            registry.execute(cur, "get_users_and_task_count_page", (after_id, limit))
             return cur.fetchall()
 
 
-def main():
-    """Main function to demonstrate the usage of the query functions with pandas."""
+def iter_pages(fetch_page, *args, limit=100):
+    """Walk a keyset-paginated query page by page; the first column is the key."""
+    after_id = 0
+    while True:
+        page = fetch_page(*args, after_id=after_id, limit=limit)
+        if not page:
+            return
+        yield page
+        after_id = page[-1][0]
+
+
+def main(frames=False):
+    """Main function to demonstrate the usage of the query functions with pandas.
+
+    With `frames=True` the DataFrames are built straight from COPY output by
+    frames.py instead of from lists of tuples. Returns the wall-clock time of
+    the report in seconds.
+    """
+    # pandas takes longer to import than everything else here, so only the report pays for it
+    import pandas as pd
+
+    started = time.perf_counter()
+    if frames:
+        from frames import query_frame
+
+    def frame(func, columns, *args):
+        """Fetch a query result as a DataFrame with the report's column names."""
+        if frames:
+            return query_frame(func.__name__, *args).set_axis(columns, axis=1)
+        return pd.DataFrame(func(*args), columns=columns)
 
     # Create a string buffer to capture the output
     buffer = io.StringIO()
 
     buffer.write("1. Отримуємо всі завдання для конкретного користувача:")
-    tasks = get_tasks_by_user(1)
-    tasks_df = pd.DataFrame(
-        tasks, columns=["Task ID", "Title", "Description", "Status"]
-    )
+    tasks_df = frame(get_tasks_by_user, ["Task ID", "Title", "Description", "Status"], 1)
     buffer.write(f"{tasks_df}\n\n")
 
     buffer.write("\n2. Вибираємо всі завдання з конкретним статусом 'new':")
-    tasks_with_new_status = get_tasks_by_status("new")
-    tasks_with_new_status_df = pd.DataFrame(
-        tasks_with_new_status, columns=["Task ID", "Title", "Description", "Status"]
+    tasks_with_new_status_df = frame(
+        get_tasks_by_status, ["Task ID", "Title", "Description", "Status"], "new"
     )
     buffer.write(f"{tasks_with_new_status_df}\n\n")
 
@@ -261,10 +737,7 @@ def main():
         update_task_status(task_id_to_update, "in progress")
 
     buffer.write("\n4. Вибираємо всіх користувачів, які не мають жодного завдання:")
-    users_without_tasks = get_users_without_tasks()
-    users_without_tasks_df = pd.DataFrame(
-        users_without_tasks, columns=["User ID", "Fullname", "Email"]
-    )
+    users_without_tasks_df = frame(get_users_without_tasks, ["User ID", "Fullname", "Email"])
     buffer.write(f"{users_without_tasks_df}\n\n")
 
     buffer.write("\n5. Додаємо нове завдання для користувача:")
@@ -272,16 +745,14 @@ def main():
         user_id = int(users_without_tasks_df.iloc[0]["User ID"])  # Convert to int
         add_new_task_for_user("Another Task", "", "in progress", user_id)
         buffer.write("\nЗавдання користувача після додавання нового:")
-        user_tasks_df = pd.DataFrame(
-            get_tasks_by_user(user_id),
-            columns=["Task ID", "Title", "Description", "Status"],
+        user_tasks_df = frame(
+            get_tasks_by_user, ["Task ID", "Title", "Description", "Status"], user_id
         )
         buffer.write(f"{user_tasks_df}\n\n")
 
     buffer.write("\n6. Вибираємо всі завдання, які ще не завершено:")
-    incomplete_tasks = get_incomplete_tasks()
-    incomplete_tasks_df = pd.DataFrame(
-        incomplete_tasks, columns=["Task ID", "Title", "Description", "Status"]
+    incomplete_tasks_df = frame(
+        get_incomplete_tasks, ["Task ID", "Title", "Description", "Status"]
     )
     buffer.write(f"{incomplete_tasks_df}\n\n")
 
@@ -294,16 +765,14 @@ def main():
         buffer.write(f"\nВидалення завдання із ID {task_id_to_delete}")
         delete_task_by_id(task_id_to_delete)
         buffer.write("\nЗавдання користувача після видалення:")
-        updated_user_tasks_df = pd.DataFrame(
-            get_tasks_by_user(user_id),
-            columns=["Task ID", "Title", "Description", "Status"],
+        updated_user_tasks_df = frame(
+            get_tasks_by_user, ["Task ID", "Title", "Description", "Status"], user_id
         )
         buffer.write(f"{updated_user_tasks_df}\n\n")
 
     buffer.write("\n8. Знаходимо користувачів за електронною поштою з умовою LIKE:")
-    users_by_email_df = pd.DataFrame(
-        find_users_by_email_pattern("%@example.com%"),
-        columns=["User ID", "Fullname", "Email"],
+    users_by_email_df = frame(
+        find_users_by_email_pattern, ["User ID", "Fullname", "Email"], "%@example.com%"
     )
     buffer.write(f"{users_by_email_df}\n\n")
 
@@ -312,45 +781,83 @@ def main():
     buffer.write("\nUser 1's name updated to 'John Doe'.")
 
     buffer.write("\n10. Отримуємо кількість завдань для кожного статусу:")
-    task_count_status_df = pd.DataFrame(
-        get_task_count_by_status(), columns=["Status", "Task Count"]
-    )
+    task_count_status_df = frame(get_task_count_by_status, ["Status", "Task Count"])
     buffer.write(f"{task_count_status_df}\n\n")
 
     buffer.write(
         "\n11. Вибираємо завдання, призначені користувачам, чия електронна пошта містить '@example.com':"
     )
-    tasks_with_email_domain_df = pd.DataFrame(
-        get_tasks_for_users_with_email_domain("@example.com"),
-        columns=["Task ID", "Title", "Description", "Fullname", "Email", "Status"],
+    tasks_with_email_domain_df = frame(
+        get_tasks_for_users_with_email_domain,
+        ["Task ID", "Title", "Description", "Fullname", "Email", "Status"],
+        "@example.com",
     )
     buffer.write(f"{tasks_with_email_domain_df}\n\n")
 
     buffer.write("\n12. Вибираємо завдання, у яких відсутній опис:")
-    tasks_without_description_df = pd.DataFrame(
-        get_tasks_without_description(),
-        columns=["Task ID", "Title", "User ID", "Status ID"],
+    tasks_without_description_df = frame(
+        get_tasks_without_description, ["Task ID", "Title", "User ID", "Status ID"]
     )
     buffer.write(f"{tasks_without_description_df}\n\n")
 
     buffer.write(
         "\n13. Вибираємо користувачів та їхні завдання, які знаходяться у статусі 'in progress':"
     )
-    users_with_tasks_in_progress_df = pd.DataFrame(
-        get_users_with_tasks_in_progress(),
-        columns=["User ID", "Fullname", "Task ID", "Title", "Description", "Status"],
+    users_with_tasks_in_progress_df = frame(
+        get_users_with_tasks_in_progress,
+        ["User ID", "Fullname", "Task ID", "Title", "Description", "Status"],
     )
     buffer.write(f"{users_with_tasks_in_progress_df}\n\n")
 
     buffer.write("\n14. Отримуємо користувачів та кількість їхніх завдань:")
-    users_task_count_df = pd.DataFrame(
-        get_users_and_task_count(),
-        columns=["User ID", "Fullname", "Email", "Task Count"],
+    users_task_count_df = frame(
+        get_users_and_task_count, ["User ID", "Fullname", "Email", "Task Count"]
     )
     buffer.write(f"{users_task_count_df}\n\n")
 
+    if read_cache.enabled:
+        buffer.write("\nСтатистика кешу запитів:")
+        buffer.write(f"{pd.Series(read_cache.stats())}\n")
+
+    buffer.write("\nСтатистика запитів (мс):")
+    buffer.write(f"\n{pd.DataFrame(instrument.stats.summary())}\n")
+
+    buffer.write("\nСтатистика пулу підключень:")
+    buffer.write(f"{pd.Series(get_pool().stats())}\n")
+
     with open('output.txt', 'w', encoding='utf-8') as f:
         f.write(buffer.getvalue())
 
+    return time.perf_counter() - started
+
+
+def async_main():
+    """Run the async report from async_query.py; returns its wall-clock time in seconds."""
+    import asyncio
+
+    import async_query
+
+    if sys.platform == "win32":
+        # psycopg's async mode needs a selector event loop on Windows
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    report, elapsed = asyncio.run(async_query.run_main())
+    with open('output_async.txt', 'w', encoding='utf-8') as f:
+        f.write(report)
+    return elapsed
+
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Task management report")
+    parser.add_argument(
+        "--mode", choices=["sync", "async", "both"], default="sync",
+        help="async runs the read-only steps concurrently and writes output_async.txt",
+    )
+    parser.add_argument(
+        "--frames", action="store_true",
+        help="build the sync report's DataFrames from COPY output instead of tuples",
+    )
+    args = parser.parse_args()
+    if args.mode in ("sync", "both"):
+        print(f"sync:  {main(frames=args.frames):.3f} s")
+    if args.mode in ("async", "both"):
+        print(f"async: {async_main():.3f} s")
@@ -0,0 +1,247 @@
+import argparse
+import contextlib
+import itertools
+import os
+import time
+
+import psycopg2
+from psycopg2 import extensions, sql
+
+import db
+import init
+import statuses
+from cache import read_cache
+from seed_parallel import seed_parallel
+
+# Seeded snapshot that every clone is copied from
+template_db = os.getenv("POSTGRES_TEMPLATE_DB", f"{db.db_name}_template")
+# Database to connect to for CREATE and DROP DATABASE
+maintenance_db = os.getenv("POSTGRES_MAINTENANCE_DB", "postgres")
+
+# Savepoint that stands for the last commit inside a rolled-back test transaction
+SAVEPOINT = "reset_commit"
+
+_clone_numbers = itertools.count(1)
+
+
+@contextlib.contextmanager
+def admin_cursor():
+    """Autocommit cursor on the maintenance database; CREATE DATABASE cannot run in a transaction."""
+    conn = psycopg2.connect(
+        host=db.db_host, database=maintenance_db, user=db.db_user, password=db.db_password
+    )
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            yield cur
+    finally:
+        conn.close()
+
+
+def use_database(name):
+    """Point db.py, and processes started from now on, at another database.
+
+    Returns the previous database name. Pooled connections, cached statuses
+    and cached reads belong to the previous database, so they are dropped.
+    """
+    previous = db.db_name
+    db.close_pool()
+    db.db_name = name
+    # Seeding workers started with spawn read the name from the environment
+    os.environ["POSTGRES_DB"] = name
+    statuses.invalidate()
+    read_cache.clear()
+    return previous
+
+
+def _drop(cur, name):
+    # FORCE ends the sessions that are still connected to the database
+    cur.execute(sql.SQL("DROP DATABASE IF EXISTS {} WITH (FORCE);").format(sql.Identifier(name)))
+
+
+def template_key(num_users, num_tasks, seed, partition_by):
+    """Describe what a template holds; a template with a different key is rebuilt."""
+    version = init.MIGRATIONS[-1][0]
+    return (
+        f"migrations={version} users={num_users} tasks={num_tasks} seed={seed} "
+        f"partition_by={partition_by or 'none'}"
+    )
+
+
+def build_template(num_users=20, num_tasks=50, seed=0, partition_by=init.tasks_partition_by,
+                   rebuild=False, template=None):
+    """Create, migrate and seed the template database unless an up-to-date one exists.
+
+    The key from template_key() is stored as the database comment once the
+    build succeeds, so an interrupted build is redone. An advisory lock keeps
+    concurrent builders, e.g. pytest-xdist workers, from racing. Returns True
+    if the template was (re)built.
+    """
+    template = template or template_db
+    key = template_key(num_users, num_tasks, seed, partition_by)
+    with admin_cursor() as cur:
+        cur.execute("SELECT pg_advisory_lock(hashtext(%s));", (template,))
+        try:
+            cur.execute(
+                "SELECT shobj_description(oid, 'pg_database') FROM pg_database WHERE datname = %s;",
+                (template,),
+            )
+            row = cur.fetchone()
+            if row and row[0] == key and not rebuild:
+                return False
+            _drop(cur, template)
+            cur.execute(sql.SQL("CREATE DATABASE {};").format(sql.Identifier(template)))
+            previous = use_database(template)
+            try:
+                init.init_database(partition_by)
+                seed_parallel(num_users, num_tasks, seed=seed)
+                db.close_pool()
+                conn = db.get_connection()
+                try:
+                    conn.autocommit = True
+                    with conn.cursor() as vacuum_cur:
+                        # Frozen, analyzed pages make every clone ready to query as is
+                        vacuum_cur.execute("VACUUM (FREEZE, ANALYZE);")
+                finally:
+                    conn.close()
+            finally:
+                use_database(previous)
+            cur.execute(sql.SQL("COMMENT ON DATABASE {} IS {};").format(
+                sql.Identifier(template), sql.Literal(key)
+            ))
+            return True
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(hashtext(%s));", (template,))
+
+
+def clone_database(name=None, template=None):
+    """Create a database as a copy of the template and return its name.
+
+    CREATE DATABASE ... TEMPLATE copies files instead of replaying the schema
+    and the seed, so a clone of a small template takes well under a second.
+    """
+    template = template or template_db
+    name = name or f"{template}_{os.getpid()}_{next(_clone_numbers)}"
+    with admin_cursor() as cur:
+        # Waits for a rebuild of the template; released when the connection closes
+        cur.execute("SELECT pg_advisory_lock_shared(hashtext(%s));", (template,))
+        _drop(cur, name)
+        # WAL_LOG, the default since Postgres 15, is slower for small templates
+        strategy = " STRATEGY = FILE_COPY" if cur.connection.server_version >= 150000 else ""
+        cur.execute(sql.SQL("CREATE DATABASE {} TEMPLATE {}" + strategy + ";").format(
+            sql.Identifier(name), sql.Identifier(template)
+        ))
+    return name
+
+
+def drop_database(name):
+    with admin_cursor() as cur:
+        _drop(cur, name)
+
+
+@contextlib.contextmanager
+def cloned_database(template=None):
+    """Run the block against a fresh clone of the template, dropped afterwards."""
+    name = clone_database(template=template)
+    previous = use_database(name)
+    try:
+        yield name
+    finally:
+        use_database(previous)
+        drop_database(name)
+
+
+class SavepointConnection(extensions.connection):
+    """Connection whose commit() and rollback() stay inside one outer transaction.
+
+    commit() moves the SAVEPOINT forward and rollback() returns to it, so code
+    that manages its own transactions, like db.connection(), runs unchanged
+    while rollback_all() undoes everything it did.
+    """
+
+    def begin_outer(self):
+        self._run(f"SAVEPOINT {SAVEPOINT};")
+
+    def commit(self):
+        self._run(f"RELEASE SAVEPOINT {SAVEPOINT}; SAVEPOINT {SAVEPOINT};")
+
+    def rollback(self):
+        self._run(f"ROLLBACK TO SAVEPOINT {SAVEPOINT};")
+
+    def rollback_all(self):
+        super().rollback()
+
+    def _run(self, statement):
+        with self.cursor(cursor_factory=extensions.cursor) as cur:
+            cur.execute(statement)
+
+
+class PinnedPool:
+    """Stand-in for db.ConnectionPool that always hands out the same connection."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._checkouts = 0
+
+    def getconn(self, timeout=None):
+        self._checkouts += 1
+        return self.conn
+
+    def putconn(self, conn, close=False):
+        pass
+
+    def closeall(self):
+        self.conn.close()
+
+    def stats(self):
+        return {"size": 1, "idle": 0, "in_use": 1, "checkouts": self._checkouts}
+
+
+@contextlib.contextmanager
+def rollback_after():
+    """Run the block on one pinned connection and roll back everything it wrote.
+
+    Every db.connection() in the block gets the same SavepointConnection, so
+    the code sees its own writes and nothing reaches other sessions. The
+    async layer uses its own pool and is not covered.
+    """
+    conn = db.get_connection(connection_factory=SavepointConnection)
+    read_cache.clear()
+    try:
+        conn.begin_outer()
+        with db.pool_override(PinnedPool(conn)):
+            yield conn
+    finally:
+        conn.rollback_all()
+        conn.close()
+        # Cached reads and statuses may describe rows that no longer exist
+        read_cache.clear()
+        statuses.invalidate()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Template database for fast resets")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="create and seed the template database")
+    build.add_argument("--users", type=int, default=20)
+    build.add_argument("--tasks", type=int, default=50)
+    build.add_argument("--seed", type=int, default=0)
+    build.add_argument("--rebuild", action="store_true", help="rebuild even if up to date")
+    clone = commands.add_parser("clone", help="copy the template into a new database")
+    clone.add_argument("name", nargs="?")
+    drop = commands.add_parser("drop", help="drop a database, e.g. a clone")
+    drop.add_argument("name")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    started = time.perf_counter()
+    if args.command == "build":
+        built = build_template(args.users, args.tasks, args.seed, rebuild=args.rebuild)
+        print(f"{template_db}: {'built' if built else 'up to date'}")
+    elif args.command == "clone":
+        print(f"{clone_database(args.name)}")
+    else:
+        drop_database(args.name)
+    print(f"{time.perf_counter() - started:.3f}s")
@@ -1,37 +1,34 @@
-import os
-import psycopg2
-from faker import Faker
-
-# Ініціалізація Faker
-fake = Faker()
-
-# Отримуємо параметри підключення з змінних середовища або використовуємо значення за замовчуванням
-db_host = os.getenv('POSTGRES_HOST', 'localhost')
-db_name = os.getenv('POSTGRES_DB', 'hw03')
-db_user = os.getenv('POSTGRES_USER', 'postgres')
-db_password = os.getenv('POSTGRES_PASSWORD', 'postgres')
-
-# Параметри підключення до PostgreSQL
-conn = psycopg2.connect(
-    host=db_host,
-    database=db_name,
-    user=db_user,
-    password=db_password
-)
-
-# Створення курсора для виконання SQL-запитів
-cur = conn.cursor()
+import argparse
+import csv
+import io
+import itertools
+import time
+
+from db import connection
+from init import deferred_task_counters, rebuild_task_counters
+
+# Faker імпортується та створюється під час першого використання, а не під час імпорту модуля
+_fake = None
+
+def get_fake():
+    global _fake
+    if _fake is None:
+        from faker import Faker
+        _fake = Faker()
+    return _fake
 
 # Генеруємо випадкових користувачів та додаємо їх у таблицю users
-def seed_users(num_users):
+def seed_users(cur, num_users):
+    fake = get_fake()
     for _ in range(num_users):
         fullname = fake.name()
         email = fake.unique.email()
         cur.execute("INSERT INTO users (fullname, email) VALUES (%s, %s)", (fullname, email))
-    conn.commit()
+    cur.connection.commit()
 
 # Генеруємо випадкові завдання для користувачів
-def seed_tasks(num_tasks):
+def seed_tasks(cur, num_tasks):
+    fake = get_fake()
     cur.execute("SELECT id FROM users")
     user_ids = [row[0] for row in cur.fetchall()]  # Отримуємо список всіх id користувачів
 
@@ -45,20 +42,116 @@ def seed_tasks(num_tasks):
         user_id = fake.random_element(user_ids[1:])  # Випадковий користувач (один буде без завдань)
         cur.execute("INSERT INTO tasks (title, description, status_id, user_id) VALUES (%s, %s, %s, %s)",
                     (title, description, status_id, user_id))
-    conn.commit()
+    cur.connection.commit()
+
+# Записує рядки в таблицю через COPY ... FROM STDIN порціями по batch_size
+# і повертає розмір кожної порції, тому пам'ять не залежить від загальної
+# кількості рядків, а викликач сам вирішує, коли фіксувати транзакцію
+def copy_chunks(cur, table, columns, rows, batch_size):
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    rows = iter(rows)
+    while chunk := list(itertools.islice(rows, batch_size)):
+        buf = io.StringIO()
+        csv.writer(buf).writerows(chunk)
+        buf.seek(0)
+        cur.copy_expert(sql, buf)
+        yield len(chunk)
+
+# Завантажує рядки порціями, фіксуючи кожну та виводячи швидкість
+def copy_rows(cur, table, columns, rows, total, batch_size):
+    started = time.perf_counter()
+    done = 0
+    for copied in copy_chunks(cur, table, columns, rows, batch_size):
+        cur.connection.commit()
+        done += copied
+        elapsed = time.perf_counter() - started
+        rate = done / elapsed if elapsed else 0.0
+        print(f"  {table}: {done}/{total} rows, {rate:,.0f} rows/s", flush=True)
+    return done
+
+# Генерує користувачів; номер рядка в email гарантує унікальність без fake.unique
+def generate_users(num_users, start=0):
+    fake = get_fake()
+    for n in range(start, start + num_users):
+        local, domain = fake.email().split("@")
+        yield fake.name(), f"{local}.{n}@{domain}"
+
+# Генерує завдання для користувачів з діапазону ідентифікаторів
+def generate_tasks(num_tasks, pick_user_id, status_ids):
+    fake = get_fake()
+    rng = fake.random
+    for _ in range(num_tasks):
+        yield (
+            fake.sentence(nb_words=6),
+            fake.text(max_nb_chars=200),
+            rng.choice(status_ids),
+            pick_user_id(),
+        )
+
+# Повертає функцію вибору випадкового користувача (крім першого, щоб один лишився без завдань)
+def user_id_picker(cur):
+    cur.execute("SELECT min(id), max(id), count(*) FROM users")
+    min_id, max_id, count = cur.fetchone()
+    if count < 2:
+        raise RuntimeError("Для генерації завдань потрібно щонайменше 2 користувачі")
+    rng = get_fake().random
+    if max_id - min_id + 1 == count:
+        # Ідентифікатори йдуть без пропусків — не тримаємо їх у пам'яті
+        return lambda: rng.randint(min_id + 1, max_id)
+    cur.execute("SELECT id FROM users ORDER BY id OFFSET 1")
+    user_ids = [row[0] for row in cur.fetchall()]
+    return lambda: rng.choice(user_ids)
+
+def bulk_seed_users(cur, num_users, batch_size):
+    cur.execute("SELECT coalesce(max(id), 0) FROM users")
+    start = cur.fetchone()[0]
+    return copy_rows(cur, "users", ("fullname", "email"),
+                     generate_users(num_users, start), num_users, batch_size)
+
+def bulk_seed_tasks(cur, num_tasks, batch_size):
+    cur.execute("SELECT id FROM status")
+    status_ids = [row[0] for row in cur.fetchall()]
+    rows = generate_tasks(num_tasks, user_id_picker(cur), status_ids)
+    # Лічильники завдань перераховуються один раз після завантаження, а не для кожної порції
+    with deferred_task_counters(cur):
+        done = copy_rows(cur, "tasks", ("title", "description", "status_id", "user_id"),
+                         rows, num_tasks, batch_size)
+    cur.execute(rebuild_task_counters)
+    cur.connection.commit()
+    return done
 
 # Головна функція для запуску генерації даних
-def seed_database():
-    print("Seeding users...")
-    seed_users(20)  # Генеруємо 20 користувачів
+def seed_database(num_users=20, num_tasks=50, bulk=False, batch_size=10_000):
+    started = time.perf_counter()
+    # Беремо підключення зі спільного пулу лише на час заповнення
+    with connection() as conn:
+        with conn.cursor() as cur:
+            print("Seeding users...")
+            if bulk:
+                bulk_seed_users(cur, num_users, batch_size)
+            else:
+                seed_users(cur, num_users)
 
-    print("Seeding tasks...")
-    seed_tasks(50)  # Генеруємо 50 завдань
+            print("Seeding tasks...")
+            if bulk:
+                bulk_seed_tasks(cur, num_tasks, batch_size)
+            else:
+                seed_tasks(cur, num_tasks)
+
+    elapsed = time.perf_counter() - started
+    print(f"Seeded {num_users} users and {num_tasks} tasks in {elapsed:.1f}s "
+          f"({(num_users + num_tasks) / elapsed:,.0f} rows/s)")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Заповнення бази даних випадковими даними")
+    parser.add_argument("--users", type=int, default=20, help="кількість користувачів")
+    parser.add_argument("--tasks", type=int, default=50, help="кількість завдань")
+    parser.add_argument("--bulk", action="store_true", help="завантажувати дані через COPY")
+    parser.add_argument("--batch-size", type=int, default=10_000,
+                        help="кількість рядків в одній порції COPY")
+    return parser.parse_args(argv)
 
 # Викликаємо функцію для заповнення бази
 if __name__ == "__main__":
-    seed_database()
-
-# Закриваємо курсор і підключення
-cur.close()
-conn.close()
+    args = parse_args()
+    seed_database(args.users, args.tasks, bulk=args.bulk, batch_size=args.batch_size)
@@ -0,0 +1,170 @@
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from db import connection
+from init import deferred_task_counters, rebuild_task_counters
+from seed import copy_chunks
+
+
+def shard_faker(seed, kind, shard):
+    """Return a Faker seeded only by (seed, kind, shard), so shards are reproducible."""
+    from faker import Faker
+
+    fake = Faker()
+    fake.seed_instance(f"{seed}:{kind}:{shard}")
+    return fake
+
+
+def shard_bounds(shard, shard_size, total):
+    """Return the [start, stop) row range covered by a shard."""
+    start = shard * shard_size
+    return start, min(total, start + shard_size)
+
+
+def generate_user_shard(seed, shard, shard_size, total, first_id):
+    """Yield (id, fullname, email) rows of one shard; the id keeps emails globally unique."""
+    fake = shard_faker(seed, "users", shard)
+    start, stop = shard_bounds(shard, shard_size, total)
+    for n in range(start, stop):
+        user_id = first_id + n
+        local, domain = fake.email().split("@")
+        yield user_id, fake.name(), f"{local}.{user_id}@{domain}"
+
+
+def generate_task_shard(seed, shard, shard_size, total, first_id, user_range, status_ids):
+    """Yield (id, title, description, status_id, user_id) rows of one shard."""
+    fake = shard_faker(seed, "tasks", shard)
+    rng = fake.random
+    low_user, high_user = user_range
+    start, stop = shard_bounds(shard, shard_size, total)
+    for n in range(start, stop):
+        yield (
+            first_id + n,
+            fake.sentence(nb_words=6),
+            fake.text(max_nb_chars=200),
+            rng.choice(status_ids),
+            rng.randint(low_user, high_user),
+        )
+
+
+def load_user_shard(seed, shard, shard_size, total, first_id, batch_size):
+    rows = generate_user_shard(seed, shard, shard_size, total, first_id)
+    with connection() as conn:
+        with conn.cursor() as cur:
+            return sum(copy_chunks(cur, "users", ("id", "fullname", "email"), rows, batch_size))
+
+
+def load_task_shard(seed, shard, shard_size, total, first_id, user_range, status_ids, batch_size):
+    rows = generate_task_shard(seed, shard, shard_size, total, first_id, user_range, status_ids)
+    with connection() as conn:
+        with conn.cursor() as cur:
+            # Shards would otherwise all queue on the same few counter rows;
+            # seed_parallel() rebuilds the counters once every shard is in
+            with deferred_task_counters(cur):
+                return sum(copy_chunks(
+                    cur, "tasks", ("id", "title", "description", "status_id", "user_id"),
+                    rows, batch_size,
+                ))
+
+
+def next_id(table):
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT coalesce(max(id), 0) + 1 FROM {table};")
+            return cur.fetchone()[0]
+
+
+def rebuild_counters():
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(rebuild_task_counters)
+
+
+def sync_sequence(table):
+    """Move the SERIAL sequence past the explicitly loaded ids."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"(SELECT coalesce(max(id), 1) FROM {table}));"
+            )
+
+
+def run_shards(label, total, shard_size, submit):
+    """Submit every shard of a table and report progress as they complete."""
+    started = time.perf_counter()
+    shards = (total + shard_size - 1) // shard_size
+    futures = [submit(shard) for shard in range(shards)]
+    done = 0
+    for future in as_completed(futures):
+        done += future.result()
+        elapsed = time.perf_counter() - started
+        print(f"  {label}: {done}/{total} rows, {done / elapsed:,.0f} rows/s", flush=True)
+    return time.perf_counter() - started
+
+
+def seed_parallel(num_users, num_tasks, workers=None, seed=0, shard_size=100_000, batch_size=10_000):
+    """Generate and load users and tasks in `workers` processes.
+
+    Shards are fixed-size and seeded by (seed, shard) with explicit ids, so the
+    same seed yields the same dataset on an empty database whatever the worker
+    count or completion order.
+    """
+    if num_users < 2 and num_tasks:
+        raise ValueError("at least 2 users are needed to seed tasks")
+    workers = workers or os.cpu_count()
+    first_user = next_id("users")
+    first_task = next_id("tasks")
+
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id FROM status ORDER BY id;")
+            status_ids = [row[0] for row in cur.fetchall()]
+
+    # The first seeded user is left without tasks, as in seed.py
+    user_range = (first_user + 1, first_user + num_users - 1)
+
+    started = time.perf_counter()
+    # Spawned workers start without the parent's pooled connections, which the
+    # lookups above have already opened, and open their own
+    spawn = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=spawn) as executor:
+        print(f"Seeding users with {workers} workers...")
+        run_shards("users", num_users, shard_size, lambda shard: executor.submit(
+            load_user_shard, seed, shard, shard_size, num_users, first_user, batch_size,
+        ))
+        sync_sequence("users")
+
+        print(f"Seeding tasks with {workers} workers...")
+        run_shards("tasks", num_tasks, shard_size, lambda shard: executor.submit(
+            load_task_shard, seed, shard, shard_size, num_tasks, first_task,
+            user_range, status_ids, batch_size,
+        ))
+        sync_sequence("tasks")
+        rebuild_counters()
+
+    elapsed = time.perf_counter() - started
+    print(f"Seeded {num_users} users and {num_tasks} tasks in {elapsed:.1f}s "
+          f"({(num_users + num_tasks) / elapsed:,.0f} rows/s)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel, reproducible database seeding")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0, help="same seed, same dataset")
+    parser.add_argument("--shard-size", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    seed_parallel(
+        args.users, args.tasks, workers=args.workers, seed=args.seed,
+        shard_size=args.shard_size, batch_size=args.batch_size,
+    )
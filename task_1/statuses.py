@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+
+from db import connection
+
+# How long the status dictionary is trusted before it is reloaded
+status_cache_ttl = float(os.getenv("STATUS_CACHE_TTL", "300"))
+
+
+class UnknownStatusError(LookupError):
+    """Raised when a status name does not exist in the status table."""
+
+
+class StatusCache:
+    """In-process name <-> id dictionary of the tiny, rarely changing status table."""
+
+    def __init__(self, ttl=status_cache_ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._ids = {}
+        self._names = {}
+        self._loaded_at = None
+        self._generation = 0
+
+    def id_of(self, name):
+        """Return the id of a status name, reloading once if the name is unknown."""
+        ids, _ = self._current()
+        if name not in ids:
+            # The name may have been added since the last load
+            ids, _ = self._load()
+        try:
+            return ids[name]
+        except KeyError:
+            raise UnknownStatusError(f"unknown task status: {name!r}") from None
+
+    def name_of(self, status_id):
+        """Return the name of a status id, reloading once if the id is unknown."""
+        _, names = self._current()
+        if status_id not in names:
+            _, names = self._load()
+        try:
+            return names[status_id]
+        except KeyError:
+            raise UnknownStatusError(f"unknown task status id: {status_id!r}") from None
+
+    def invalidate(self):
+        """Forget the loaded statuses; the next lookup reloads them."""
+        with self._lock:
+            self._loaded_at = None
+            self._generation += 1
+
+    def _stale(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def _current(self):
+        """Return (ids, names), loading them first if they are stale."""
+        with self._lock:
+            if not self._stale():
+                return self._ids, self._names
+        return self._load()
+
+    def _load(self):
+        """Read the status table and return (ids, names).
+
+        The lock is not held during the query, so a lookup never waits for a
+        pooled connection while another thread holds the lock. A load that
+        raced with invalidate() returns its rows but does not keep them.
+        """
+        with self._lock:
+            generation = self._generation
+        with connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT id, name FROM status;")
+                rows = cur.fetchall()
+        ids = {name: status_id for status_id, name in rows}
+        names = {status_id: name for status_id, name in rows}
+        with self._lock:
+            if generation == self._generation:
+                self._ids, self._names = ids, names
+                self._loaded_at = time.monotonic()
+        return ids, names
+
+
+_cache = StatusCache()
+
+
+def status_id(name):
+    """Return the id of a status name from the process-wide cache."""
+    return _cache.id_of(name)
+
+
+def status_name(status_id):
+    """Return the name of a status id from the process-wide cache."""
+    return _cache.name_of(status_id)
+
+
+def invalidate():
+    """Invalidate the process-wide status cache, e.g. after the schema changes."""
+    _cache.invalidate()
@@ -0,0 +1,50 @@
+import gc
+import os
+
+import psycopg2
+import pytest
+
+import db
+
+
+@pytest.fixture
+def process_pool():
+    """A fresh process-wide pool that has served one connection, closed afterwards."""
+    db.close_pool()
+    try:
+        with db.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+    except psycopg2.OperationalError as err:
+        db.close_pool()
+        pytest.skip(f"PostgreSQL is not available: {err}")
+    yield
+    db.close_pool()
+
+
+def backend_pid():
+    with db.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_backend_pid();")
+            return cur.fetchone()[0]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_child_keeps_parent_connections(process_pool):
+    parent_backend = backend_pid()
+
+    pid = os.fork()
+    if pid == 0:
+        # The child gets its own pool; the inherited one must not be closed or collected
+        try:
+            ok = backend_pid() != parent_backend
+            db.close_pool()
+            gc.collect()
+        except BaseException:
+            ok = False
+        os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+
+    # The idle connection skips the health check, so a terminated session would fail here
+    assert backend_pid() == parent_backend
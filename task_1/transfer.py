@@ -0,0 +1,316 @@
+import argparse
+import gzip
+import io
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import statuses
+from cache import read_cache
+from db import NULL_MARKER, connection, copy_out_sql, copy_pipe
+from init import deferred_task_counters, rebuild_task_counters
+
+# Exported columns and their Arrow types; users.email_domain is generated, so it is left out
+TABLES = {
+    "status": [("id", "int32"), ("name", "string")],
+    "users": [("id", "int32"), ("fullname", "string"), ("email", "string")],
+    "tasks": [
+        ("id", "int32"), ("title", "string"), ("description", "string"),
+        ("status_id", "int32"), ("user_id", "int32"),
+    ],
+}
+
+# Import order: tables of a level load in parallel, a level starts after the
+# previous one, so foreign keys always find their rows
+LEVELS = [("status", "users"), ("tasks",)]
+
+FORMATS = {"csv.gz": "csv.gz", "parquet": "parquet", "arrow": "arrow"}
+
+MANIFEST = "manifest.json"
+
+# Bytes of CSV that Arrow parses into one record batch
+ARROW_BLOCK_SIZE = 16 * 1024 * 1024
+
+
+class CountingFile:
+    """File wrapper that counts the bytes passed through read() or write()."""
+
+    def __init__(self, file):
+        self.file = file
+        self.bytes = 0
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.bytes += len(data)
+        return data
+
+    def readline(self, size=-1):
+        data = self.file.readline(size)
+        self.bytes += len(data)
+        return data
+
+    def write(self, data):
+        self.bytes += len(data)
+        return self.file.write(data)
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.csv
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet and Arrow files need pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+def _schema(pa, table):
+    return pa.schema([(name, pa.type_for_alias(type_name)) for name, type_name in TABLES[table]])
+
+
+def _copy_out_sql(table):
+    columns = ", ".join(name for name, _ in TABLES[table])
+    return copy_out_sql(f"SELECT {columns} FROM {table} ORDER BY id")
+
+
+def _copy_in_sql(target, columns):
+    return f"COPY {target} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, HEADER true, NULL '{NULL_MARKER}')"
+
+
+def _export_csv(cur, table, path):
+    with gzip.open(path, "wb", compresslevel=6) as f:
+        counter = CountingFile(f)
+        cur.copy_expert(_copy_out_sql(table), counter)
+    return counter.bytes
+
+
+def _export_arrow(cur, table, path, file_format):
+    """Parse COPY output into Arrow record batches and write them to a Parquet or IPC file."""
+    pa = _pyarrow()
+    schema = _schema(pa, table)
+    with copy_pipe(cur, _copy_out_sql(table)) as reader:
+        counter = CountingFile(reader)
+        batches = pa.csv.open_csv(
+            counter,
+            read_options=pa.csv.ReadOptions(block_size=ARROW_BLOCK_SIZE),
+            convert_options=pa.csv.ConvertOptions(
+                column_types=schema, null_values=[NULL_MARKER],
+                strings_can_be_null=True, quoted_strings_can_be_null=False,
+            ),
+        )
+        if file_format == "parquet":
+            writer = pa.parquet.ParquetWriter(path, schema, compression="zstd")
+        else:
+            writer = pa.ipc.new_file(path, schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+        with writer:
+            for batch in batches:
+                writer.write_table(pa.Table.from_batches([batch], schema))
+    return counter.bytes
+
+
+def _sequence(cur, table):
+    """Return (last_value, is_called) of the SERIAL sequence behind table.id."""
+    cur.execute("SELECT pg_get_serial_sequence(%s, 'id');", (table,))
+    sequence = cur.fetchone()[0]
+    cur.execute(f"SELECT last_value, is_called FROM {sequence};")
+    return cur.fetchone()
+
+
+def export_table(snapshot, table, directory, file_format):
+    """Export one table as of `snapshot`; returns its manifest entry."""
+    path = os.path.join(directory, f"{table}.{FORMATS[file_format]}")
+    started = time.perf_counter()
+    with connection() as conn:
+        with conn.cursor() as cur:
+            # Every table is read from the same snapshot, so the files agree with each other
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ;")
+            cur.execute("SET TRANSACTION SNAPSHOT %s;", (snapshot,))
+            if file_format == "csv.gz":
+                copied = _export_csv(cur, table, path)
+            else:
+                copied = _export_arrow(cur, table, path, file_format)
+            rows = cur.rowcount
+            # Sequences are not transactional, so this is the value at export time;
+            # the import never sets it below max(id) anyway
+            last_value, is_called = _sequence(cur, table)
+    return {
+        "file": os.path.basename(path),
+        "rows": rows,
+        "copy_bytes": copied,
+        "file_bytes": os.path.getsize(path),
+        "seconds": time.perf_counter() - started,
+        "sequence": {"last_value": last_value, "is_called": is_called},
+    }
+
+
+def export_data(directory, file_format="csv.gz"):
+    """Export status, users and tasks into `directory`, one file per table, in parallel."""
+    if file_format not in FORMATS:
+        raise ValueError(f"unknown format: {file_format!r}")
+    os.makedirs(directory, exist_ok=True)
+    started = time.perf_counter()
+    with connection() as conn:
+        with conn.cursor() as cur:
+            # The exporting transaction keeps the snapshot alive until every table is written
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ;")
+            cur.execute("SELECT pg_export_snapshot();")
+            snapshot = cur.fetchone()[0]
+            with ThreadPoolExecutor(max_workers=len(TABLES)) as executor:
+                futures = {
+                    table: executor.submit(export_table, snapshot, table, directory, file_format)
+                    for table in TABLES
+                }
+                tables = {table: future.result() for table, future in futures.items()}
+    manifest = {"format": file_format, "tables": tables}
+    with open(os.path.join(directory, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    report("export", tables, time.perf_counter() - started)
+    return manifest
+
+
+def _import_csv(cur, table, target, path):
+    with gzip.open(path, "rb") as f:
+        cur.copy_expert(_copy_in_sql(target, [name for name, _ in TABLES[table]]), f)
+
+
+def _import_arrow(cur, target, path, file_format):
+    """Load a Parquet or IPC file batch by batch, each batch as one COPY of CSV."""
+    pa = _pyarrow()
+    write_options = pa.csv.WriteOptions(include_header=False)
+    if file_format == "parquet":
+        batches = pa.parquet.ParquetFile(path).iter_batches(batch_size=100_000)
+    else:
+        reader = pa.ipc.open_file(pa.memory_map(path))
+        batches = (reader.get_batch(index) for index in range(reader.num_record_batches))
+    for batch in batches:
+        buffer = io.BytesIO()
+        # Strings are always quoted, so only NULLs come out as empty unquoted fields
+        pa.csv.write_csv(batch, buffer, write_options)
+        buffer.seek(0)
+        cur.copy_expert(
+            f"COPY {target} ({', '.join(batch.schema.names)}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+
+
+def _merge_statuses(cur):
+    """Add the imported statuses that are missing; fail if an id or a name maps differently.
+
+    tasks.status_id is copied as is, so a status stored under another id here
+    would silently change the status of the imported tasks.
+    """
+    cur.execute(
+        """
+        SELECT i.id, i.name, s.id, s.name
+        FROM status_import AS i
+        JOIN status AS s ON s.id = i.id OR s.name = i.name
+        WHERE s.id <> i.id OR s.name <> i.name
+        ORDER BY i.id;
+        """
+    )
+    mismatches = cur.fetchall()
+    if mismatches:
+        details = ", ".join(
+            f"{name!r} is {imported_id} in the export but {existing_name!r} is {existing_id} here"
+            for imported_id, name, existing_id, existing_name in mismatches
+        )
+        raise RuntimeError(f"status ids differ from the export: {details}; import with --replace")
+    cur.execute("INSERT INTO status SELECT * FROM status_import ON CONFLICT DO NOTHING;")
+
+
+def import_table(table, directory, entry, file_format):
+    """Load one exported table and move its SERIAL sequence to the exported value."""
+    path = os.path.join(directory, entry["file"])
+    started = time.perf_counter()
+    with connection() as conn:
+        with conn.cursor() as cur:
+            target = table
+            if table == "status":
+                # init.py seeds the statuses, so they are merged rather than copied over
+                cur.execute("CREATE TEMP TABLE status_import (LIKE status) ON COMMIT DROP;")
+                target = "status_import"
+            # The task counters are rebuilt once at the end instead of per COPY
+            with deferred_task_counters(cur):
+                if file_format == "csv.gz":
+                    _import_csv(cur, table, target, path)
+                else:
+                    _import_arrow(cur, target, path, file_format)
+            if table == "status":
+                _merge_statuses(cur)
+            sequence = entry["sequence"]
+            cur.execute(
+                f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                f"GREATEST(%s, (SELECT coalesce(max(id), 1) FROM {table})), %s);",
+                (table, sequence["last_value"], sequence["is_called"]),
+            )
+    return {**entry, "seconds": time.perf_counter() - started}
+
+
+def import_data(directory, replace=False):
+    """Import an export directory level by level, the tables of a level in parallel.
+
+    users and tasks must be empty unless `replace` truncates them (and status)
+    first. The task counters are rebuilt after the load.
+    """
+    with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+        manifest = json.load(f)
+    started = time.perf_counter()
+    with connection() as conn:
+        with conn.cursor() as cur:
+            if replace:
+                cur.execute("TRUNCATE tasks, users, status RESTART IDENTITY CASCADE;")
+            else:
+                cur.execute("SELECT EXISTS (SELECT 1 FROM users) OR EXISTS (SELECT 1 FROM tasks);")
+                if cur.fetchone()[0]:
+                    raise RuntimeError("users or tasks is not empty; pass --replace to truncate them")
+    tables = {}
+    for level in LEVELS:
+        with ThreadPoolExecutor(max_workers=len(level)) as executor:
+            futures = {
+                table: executor.submit(
+                    import_table, table, directory, manifest["tables"][table], manifest["format"]
+                )
+                for table in level
+            }
+            tables.update({table: future.result() for table, future in futures.items()})
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(rebuild_task_counters)
+            cur.execute("ANALYZE status, users, tasks;")
+    statuses.invalidate()
+    read_cache.clear()
+    report("import", tables, time.perf_counter() - started)
+    return tables
+
+
+def report(action, tables, elapsed):
+    """Print rows, sizes and throughput per table and in total."""
+    print(f"{'table':<8}{'rows':>12}{'CSV, MB':>10}{'file, MB':>10}{'MB/s':>8}{'rows/s':>12}")
+    for table, entry in tables.items():
+        copy_mb, file_mb = entry["copy_bytes"] / 2**20, entry["file_bytes"] / 2**20
+        seconds = entry["seconds"] or 1e-9
+        print(f"{table:<8}{entry['rows']:>12,}{copy_mb:>10.1f}{file_mb:>10.1f}"
+              f"{copy_mb / seconds:>8.1f}{entry['rows'] / seconds:>12,.0f}")
+    total_mb = sum(entry["copy_bytes"] for entry in tables.values()) / 2**20
+    print(f"{action}: {total_mb:.1f} MB of CSV in {elapsed:.1f}s, {total_mb / elapsed:.1f} MB/s")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export and import status, users and tasks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="write one file per table and a manifest")
+    export.add_argument("directory")
+    export.add_argument("--format", choices=list(FORMATS), default="csv.gz")
+    load = commands.add_parser("import", help="load an export directory")
+    load.add_argument("directory")
+    load.add_argument("--replace", action="store_true", help="truncate users, tasks and status first")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "export":
+        export_data(args.directory, args.format)
+    else:
+        import_data(args.directory, replace=args.replace)
@@ -0,0 +1,280 @@
+import asyncio
+import functools
+import os
+import random
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import errors
+
+import main
+from main import AGE_SORT, age_filter, feature_filter, name_filter, outdated_indexes
+
+# Найбільша кількість одночасних операцій у gather_bounded; не варто перевищувати розмір пулу клієнта
+async_concurrency = int(os.getenv("MONGO_ASYNC_CONCURRENCY", "100"))
+
+_client = None
+_client_loop = None
+
+
+def get_async_client():
+    """
+    Повертає асинхронний клієнт для поточного циклу подій, створюючи його під час першого виклику.
+
+    Клієнт Motor прив'язаний до циклу подій, тому новий цикл (наприклад, наступний asyncio.run)
+    отримує новий клієнт, а клієнт попереднього циклу закривається, щоб не лишати його пул
+    підключень і фонові потоки. Параметри ті самі, що й у синхронного клієнта в main.py.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        close_async_client()
+        _client = AsyncIOMotorClient(main.mongo_uri, io_loop=loop, **main.client_options())
+        _client_loop = loop
+    return _client
+
+
+def close_async_client():
+    """
+    Закриває асинхронний клієнт, якщо його створено.
+    """
+    global _client, _client_loop
+    if _client is not None:
+        _client.close()
+    _client = _client_loop = None
+
+
+def get_cats_collection():
+    """
+    Повертає колекцію котів асинхронного клієнта.
+    """
+    return get_async_client()[main.mongo_db].cats
+
+
+def error_result(err):
+    """
+    Перетворює помилку PyMongo на результат операції.
+
+    :param err: Виняток PyMongoError
+    """
+    return {"ok": False, "error": type(err).__name__, "code": getattr(err, "code", None), "message": str(err)}
+
+
+def structured_errors(func):
+    """
+    Декоратор, що повертає помилки PyMongo як {"ok": False, ...} замість виводу, тож одна
+    невдала операція в gather_bounded не скасовує решту.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        try:
+            return {"ok": True, **await func(*args, **kwargs)}
+        except errors.PyMongoError as err:
+            return error_result(err)
+
+    return wrapper
+
+
+def retry_transient(func):
+    """
+    Асинхронний відповідник main.retry_transient для операцій, повтор яких не змінює результату.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        for attempt in range(main.mongo_retry_attempts):
+            try:
+                return await func(*args, **kwargs)
+            except errors.AutoReconnect:
+                if attempt == main.mongo_retry_attempts - 1:
+                    raise
+                await asyncio.sleep(main.mongo_retry_backoff * 2**attempt * random.uniform(0.5, 1.5))
+
+    return wrapper
+
+
+@structured_errors
+@retry_transient
+async def ensure_indexes():
+    """
+    Створює відсутні індекси колекції котів, як main.ensure_indexes.
+    """
+    cats = get_cats_collection()
+    created = []
+    for model, replace in outdated_indexes(await cats.index_information()):
+        if replace:
+            await cats.drop_index(model.document["name"])
+        await cats.create_indexes([model])
+        created.append(model.document["name"])
+    return {"created": created}
+
+
+@structured_errors
+async def create_cat(name, age, features):
+    """
+    Створює нового кота в колекції.
+
+    :param name: Ім'я кота
+    :param age: Вік кота
+    :param features: Список характеристик кота
+    """
+    result = await get_cats_collection().insert_one({"name": name, "age": age, "features": features})
+    return {"inserted_id": result.inserted_id}
+
+
+async def iter_cats(query=None, projection=None, sort=None, batch_size=None, limit=0):
+    """
+    Асинхронний генератор котів, як main.iter_cats.
+
+    :param query: Фільтр; None — усі коти
+    :param projection: Поля, які повертати
+    :param sort: Порядок, наприклад AGE_SORT
+    :param batch_size: Кількість документів в одній відповіді сервера
+    :param limit: Максимальна кількість котів; 0 — без обмеження
+    """
+    cursor = get_cats_collection().find(query or {}, projection, limit=limit)
+    if sort:
+        cursor = cursor.sort(sort)
+    cursor.batch_size(batch_size or main.read_batch_size)
+    try:
+        async for cat in cursor:
+            yield cat
+    finally:
+        await cursor.close()
+
+
+@structured_errors
+@retry_transient
+async def read_all_cats(projection=None):
+    """
+    Повертає всіх котів.
+
+    :param projection: Поля, які повертати
+    """
+    return {"cats": [cat async for cat in iter_cats(projection=projection)]}
+
+
+@structured_errors
+@retry_transient
+async def read_cat_by_name(name):
+    """
+    Шукає кота за ім'ям; "cat" дорівнює None, якщо кота не знайдено.
+
+    :param name: Ім'я кота
+    """
+    return {"cat": await get_cats_collection().find_one(name_filter(name))}
+
+
+@structured_errors
+@retry_transient
+async def read_cats_by_feature(feature):
+    """
+    Повертає котів, що мають задану характеристику.
+
+    :param feature: Характеристика
+    """
+    return {"cats": [cat async for cat in iter_cats(feature_filter(feature))]}
+
+
+@structured_errors
+@retry_transient
+async def read_cats_by_age(min_age, max_age):
+    """
+    Повертає котів, вік яких лежить у межах [min_age, max_age], за віком та ім'ям.
+
+    :param min_age: Мінімальний вік
+    :param max_age: Максимальний вік
+    """
+    return {"cats": [cat async for cat in iter_cats(age_filter(min_age, max_age), sort=AGE_SORT)]}
+
+
+@structured_errors
+@retry_transient
+async def update_cat_age(name, new_age):
+    """
+    Оновлює вік кота за його ім'ям; "matched" дорівнює 0, якщо кота не знайдено.
+
+    :param name: Ім'я кота
+    :param new_age: Новий вік кота
+    """
+    result = await get_cats_collection().update_one(name_filter(name), {"$set": {"age": new_age}})
+    return {"matched": result.matched_count}
+
+
+@structured_errors
+async def add_feature_to_cat(name, new_feature):
+    """
+    Додає нову характеристику до списку характеристик кота за його ім'ям.
+
+    :param name: Ім'я кота
+    :param new_feature: Нова характеристика
+    """
+    result = await get_cats_collection().update_one(name_filter(name), {"$push": {"features": new_feature}})
+    return {"matched": result.matched_count}
+
+
+@structured_errors
+async def delete_cat_by_name(name):
+    """
+    Видаляє кота за його ім'ям; "deleted" дорівнює 0, якщо кота не знайдено.
+
+    :param name: Ім'я кота
+    """
+    result = await get_cats_collection().delete_one(name_filter(name))
+    return {"deleted": result.deleted_count}
+
+
+@structured_errors
+@retry_transient
+async def delete_all_cats():
+    """
+    Видаляє всі записи з колекції котів.
+    """
+    result = await get_cats_collection().delete_many({})
+    return {"deleted": result.deleted_count}
+
+
+async def gather_bounded(awaitables, limit=None):
+    """
+    Виконує операції одночасно, але не більше limit водночас; результати йдуть у порядку операцій.
+
+    :param awaitables: Ітерований об'єкт співпрограм, наприклад read_cat_by_name(name) для кожного імені
+    :param limit: Найбільша кількість одночасних операцій
+    """
+    semaphore = asyncio.Semaphore(limit or async_concurrency)
+
+    async def bounded(awaitable):
+        async with semaphore:
+            return await awaitable
+
+    return await asyncio.gather(*(bounded(awaitable) for awaitable in awaitables))
+
+
+async def run_main():
+    """
+    Демонстрація асинхронних CRUD операцій: пошуки виконуються одночасно.
+    """
+    try:
+        await ensure_indexes()
+        for name, age, features in [
+            ("barsik", 3, ["ходить в капці", "дає себе гладити", "рудий"]),
+            ("murzik", 2, ["любить спати", "грає з м'ячем", "сірий"]),
+            ("pushok", 1, ["грає зі шнурком", "прямовухий", "чорний"]),
+        ]:
+            print(await create_cat(name, age, features))
+
+        print("\nОдночасний пошук котів за ім'ям:")
+        for result in await gather_bounded(read_cat_by_name(name) for name in ["barsik", "murzik", "tom"]):
+            print(result)
+
+        print("\nОновлення віку та видалення:")
+        print(await update_cat_age("barsik", 4))
+        print(await add_feature_to_cat("barsik", "любить гратися"))
+        print(await delete_cat_by_name("barsik"))
+        print(await delete_all_cats())
+    finally:
+        close_async_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_main())
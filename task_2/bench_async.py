@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import async_main
+import main
+from bench_bulk import generate_cats
+
+
+def report(label, lookups, elapsed):
+    print(f"{label:<36}{lookups:>10,}{elapsed:>10.2f}{lookups / elapsed:>14,.0f}")
+
+
+def run_sync(names):
+    for name in names:
+        main.find_cat(name)
+
+
+def run_threads(names, workers):
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(main.find_cat, names))
+
+
+async def run_async(names, limit):
+    try:
+        results = await async_main.gather_bounded((async_main.read_cat_by_name(name) for name in names), limit)
+    finally:
+        async_main.close_async_client()
+    failed = sum(not result["ok"] for result in results)
+    if failed:
+        print(f"    {failed} lookups failed, e.g. {next(r for r in results if not r['ok'])['message']}")
+
+
+def timed(label, lookups, func, *args):
+    started = time.perf_counter()
+    func(*args)
+    report(label, lookups, time.perf_counter() - started)
+
+
+def run(count, lookups, concurrency, seed):
+    """Compare sync, thread-pool and async throughput of lookups by name."""
+    if main.count_cats() != count:
+        main.get_cats_collection().drop()
+        main.create_cats(generate_cats(count, seed), batch_size=10_000)
+    main.ensure_indexes()
+    rng = random.Random(seed)
+    names = [f"cat{rng.randrange(count)}" for _ in range(lookups)]
+
+    print(f"{'lookups by name':<36}{'lookups':>10}{'seconds':>10}{'lookups/s':>14}")
+    timed("sync, one by one", lookups, run_sync, names)
+    for limit in concurrency:
+        timed(f"thread pool, {limit} workers", lookups, run_threads, names, limit)
+        started = time.perf_counter()
+        asyncio.run(run_async(names, limit))
+        report(f"async gather_bounded, limit {limit}", lookups, time.perf_counter() - started)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sync, thread-pool and async lookups by name")
+    parser.add_argument("--count", type=int, default=100_000, help="cats in the benchmark collection")
+    parser.add_argument("--lookups", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 100],
+                        help="thread-pool workers and async limits to try")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database", default="cats_bench",
+                        help="database to read from; seeded if its size differs from --count")
+    parser.add_argument("--drop", action="store_true", help="drop the database afterwards")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.database == main.mongo_db:
+        raise SystemExit(f"refusing to reseed {args.database}; pick another database")
+    main.mongo_db = args.database
+    try:
+        run(args.count, args.lookups, args.concurrency, args.seed)
+    finally:
+        if args.drop:
+            main.get_client().drop_database(args.database)
@@ -0,0 +1,83 @@
+import argparse
+import random
+import time
+
+import main
+
+FEATURES = [
+    "рудий", "сірий", "чорний", "білий", "любить спати", "любить рибу",
+    "грає з м'ячем", "грає з мишкою", "ходить в капці", "дає себе гладити",
+]
+
+
+def generate_cats(count, seed=0, start=0):
+    """Yield `count` random cats without building a list; names are unique."""
+    rng = random.Random(seed)
+    for number in range(start, start + count):
+        yield {"name": f"cat{number}", "age": rng.randint(1, 20), "features": rng.sample(FEATURES, 3)}
+
+
+def timed(label, count, func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<40}{count:>12,}{elapsed:>10.2f}{count / elapsed:>14,.0f}")
+    return result
+
+
+def insert_one_by_one(cats):
+    """The create_cat path: one insert_one round trip per cat."""
+    for cat in cats:
+        main.get_cats_collection().insert_one(dict(cat))
+
+
+def update_one_by_one(ages):
+    for name, age in ages:
+        main.get_cats_collection().update_one({"name": name}, {"$set": {"age": age}})
+
+
+def run(count, single, batch_sizes, write_concerns, seed):
+    """Compare per-document writes with the batched API on a throwaway database."""
+    print(f"{'operation':<40}{'documents':>12}{'seconds':>10}{'docs/s':>14}")
+    main.get_cats_collection().drop()
+    timed("insert_one", single, insert_one_by_one, generate_cats(single, seed))
+    main.get_cats_collection().drop()
+    for w in write_concerns:
+        for batch_size in batch_sizes:
+            main.get_cats_collection().drop()
+            summary = timed(f"create_cats batch={batch_size} w={w}", count, main.create_cats,
+                            generate_cats(count, seed), batch_size=batch_size, w=w)
+            if summary["errors"]:
+                print(f"    {len(summary['errors'])} documents failed, e.g. {summary['errors'][0]}")
+
+    rng = random.Random(seed)
+    ages = [(f"cat{rng.randrange(count)}", rng.randint(1, 20)) for _ in range(single)]
+    timed("update_one", single, update_one_by_one, ages)
+    ages = [(f"cat{rng.randrange(count)}", rng.randint(1, 20)) for _ in range(count)]
+    timed(f"update_cats_age batch={batch_sizes[-1]}", count, main.update_cats_age,
+          ages, batch_size=batch_sizes[-1])
+    names = (f"cat{number}" for number in range(count))
+    timed(f"delete_cats_by_name batch={batch_sizes[-1]}", count, main.delete_cats_by_name,
+          names, batch_size=batch_sizes[-1])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Per-document vs batched writes to the cats collection")
+    parser.add_argument("--count", type=int, default=100_000, help="cats for the batched runs")
+    parser.add_argument("--single", type=int, default=10_000, help="cats for the one-by-one runs")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 1000, 10_000])
+    parser.add_argument("--w", nargs="+", default=["1"], help='write concerns, e.g. 0 1 majority')
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database", default="cats_bench", help="database to write to; dropped afterwards")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.database == main.mongo_db:
+        raise SystemExit(f"refusing to benchmark in {args.database}, it would be dropped afterwards")
+    main.mongo_db = args.database
+    try:
+        run(args.count, args.single, args.batch_sizes, args.w, args.seed)
+    finally:
+        main.get_client().drop_database(args.database)
@@ -0,0 +1,75 @@
+import argparse
+import time
+
+import main
+from bench_bulk import generate_cats
+
+
+def consume(label, rows):
+    """Drain an iterable of cats; return time to the first cat, total time and the count."""
+    started = time.perf_counter()
+    first = None
+    count = 0
+    for _ in rows:
+        if first is None:
+            first = time.perf_counter() - started
+        count += 1
+    total = time.perf_counter() - started
+    print(f"{label:<44}{count:>12,}{(first or 0) * 1000:>12.1f}{total:>10.2f}")
+
+
+def count_then_find():
+    """The original read_all_cats: an exact count, then the whole collection as one list."""
+    cats = main.get_cats_collection()
+    cats.count_documents({})
+    return list(cats.find())
+
+
+def pages(page_size, projection=None):
+    for page in main.iter_cat_pages(page_size, projection=projection):
+        yield from page
+
+
+def run(count, batch_sizes, page_size, seed):
+    """Compare the original full reads with the streaming, projected and paginated ones."""
+    if main.count_cats() != count:
+        main.get_cats_collection().drop()
+        main.create_cats(generate_cats(count, seed), batch_size=10_000)
+    print(f"{'read':<44}{'cats':>12}{'first, ms':>12}{'seconds':>10}")
+    consume("count_documents + list(find())", count_then_find())
+    for batch_size in batch_sizes:
+        consume(f"iter_cats batch_size={batch_size}", main.iter_cats(batch_size=batch_size))
+    consume(f"iter_cats projection=name batch_size={batch_sizes[-1]}",
+            main.iter_cats(projection={"_id": 0, "name": 1}, batch_size=batch_sizes[-1]))
+    consume(f"iter_cat_pages page_size={page_size}", pages(page_size))
+    consume(f"iter_cat_pages projection=name page_size={page_size}", pages(page_size, {"name": 1}))
+
+    for estimate in (False, True):
+        started = time.perf_counter()
+        main.count_cats(estimate=estimate)
+        label = "estimated_document_count" if estimate else "count_documents"
+        print(f"{label:<44}{(time.perf_counter() - started) * 1000:>12.1f} ms")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Time to first cat and total time of full reads")
+    parser.add_argument("--count", type=int, default=1_000_000, help="cats in the benchmark collection")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[101, 1000, 10_000])
+    parser.add_argument("--page-size", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database", default="cats_bench",
+                        help="database to read from; seeded if its size differs from --count")
+    parser.add_argument("--drop", action="store_true", help="drop the database afterwards")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.database == main.mongo_db:
+        raise SystemExit(f"refusing to reseed {args.database}; pick another database")
+    main.mongo_db = args.database
+    try:
+        run(args.count, args.batch_sizes, args.page_size, args.seed)
+    finally:
+        if args.drop:
+            main.get_client().drop_database(args.database)
@@ -0,0 +1,70 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Runs in a fresh interpreter, so every sample pays the cold import
+PROBE = """
+import contextlib, io, json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    main.read_cat_by_name("barsik")
+called = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "first_call_ms": (called - imported) * 1000}))
+"""
+
+
+def probe(directory, repetitions):
+    """Import main.py from `directory` in fresh interpreters; return median timings or the failure."""
+    samples = []
+    for _ in range(repetitions):
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE], cwd=directory, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            return {"error": (result.stdout + result.stderr).strip().splitlines()[-1]}
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+
+
+def baseline_directory(revision, target):
+    """Write main.py as of a git revision into `target`."""
+    source = subprocess.run(
+        ["git", "show", f"{revision}:./main.py"], capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    ).stdout
+    with open(os.path.join(target, "main.py"), "w", encoding="utf-8") as f:
+        f.write(source)
+    return target
+
+
+def run(baseline, repetitions):
+    variants = {"current": os.path.dirname(os.path.abspath(__file__))}
+    with tempfile.TemporaryDirectory() as tmp:
+        if baseline:
+            variants[baseline] = baseline_directory(baseline, tmp)
+        print(f"median of {repetitions} fresh interpreters")
+        print(f"{'main.py':<16}{'import, ms':>12}{'first call, ms':>16}")
+        for label, directory in variants.items():
+            timings = probe(directory, repetitions)
+            if "error" in timings:
+                print(f"{label:<16}  failed: {timings['error']}")
+            else:
+                print(f"{label:<16}{timings['import_ms']:>12.1f}{timings['first_call_ms']:>16.1f}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Import time and first-call latency of main.py")
+    parser.add_argument("--baseline", help="git revision of main.py to compare with, e.g. HEAD~1")
+    parser.add_argument("--repetitions", type=int, default=5)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.baseline, args.repetitions)
@@ -0,0 +1,59 @@
+import argparse
+import sys
+
+from bson.objectid import ObjectId
+
+import main
+
+# Every indexed lookup in main.py as the command it sends, for explain;
+# read_all_cats reads the whole collection on purpose and is left out
+CHECKS = [
+    ("read_cat_by_name", {"find": "cats", "filter": main.name_filter("barsik"), "limit": 1}),
+    ("read_cats_by_feature", {"find": "cats", "filter": main.feature_filter("сірий")}),
+    ("read_cats_by_age", {"find": "cats", "filter": main.age_filter(2, 4), "sort": dict(main.AGE_SORT)}),
+    ("iter_cat_pages", {"find": "cats", "filter": {"_id": {"$gt": ObjectId()}}, "sort": {"_id": 1}, "limit": 1000}),
+    ("update_cat_age", {"update": "cats", "updates": [
+        {"q": main.name_filter("barsik"), "u": {"$set": {"age": 4}}},
+    ]}),
+    ("add_feature_to_cat", {"update": "cats", "updates": [
+        {"q": main.name_filter("barsik"), "u": {"$push": {"features": "рудий"}}},
+    ]}),
+    ("delete_cat_by_name", {"delete": "cats", "deletes": [{"q": main.name_filter("barsik"), "limit": 1}]}),
+]
+
+
+def stages(node):
+    """Yield the stage name of every node in an explain plan tree."""
+    if isinstance(node, dict):
+        if "stage" in node:
+            yield node["stage"]
+        for value in node.values():
+            yield from stages(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from stages(item)
+
+
+def check_plans(ensure=False):
+    """Return the functions whose winning plan scans the whole cats collection."""
+    if ensure:
+        main.ensure_indexes()
+    failures = []
+    for name, command in CHECKS:
+        plan = main.get_db().command("explain", command, verbosity="queryPlanner")["queryPlanner"]["winningPlan"]
+        collscan = "COLLSCAN" in set(stages(plan))
+        print(f"{'FAIL' if collscan else 'ok':4}  {name}" + (": COLLSCAN" if collscan else ""))
+        if collscan:
+            failures.append(name)
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fail if a main.py lookup needs a collection scan")
+    parser.add_argument("--ensure", action="store_true", help="create the indexes first")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    sys.exit(1 if check_plans(args.ensure) else 0)
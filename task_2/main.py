@@ -1,15 +1,147 @@
+import functools
+import itertools
+import os
+import random
+import threading
+import time
+
 from bson.objectid import ObjectId
 
-from pymongo import MongoClient, errors
+from pymongo import ASCENDING, DeleteOne, IndexModel, MongoClient, UpdateOne, errors
+from pymongo.write_concern import WriteConcern
+
+# Налаштування підключення до MongoDB; клієнт створюється під час першого запиту, а не під час імпорту
+mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
+mongo_db = os.getenv("MONGO_DB", "cats_db")
+mongo_max_pool_size = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+mongo_min_pool_size = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+mongo_max_idle_time_ms = os.getenv("MONGO_MAX_IDLE_TIME_MS")
+mongo_server_selection_timeout_ms = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+mongo_connect_timeout_ms = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+mongo_socket_timeout_ms = os.getenv("MONGO_SOCKET_TIMEOUT_MS")
+# Наприклад, "zstd,zlib"; zstd і snappy потребують пакетів zstandard і python-snappy
+mongo_compressors = os.getenv("MONGO_COMPRESSORS")
+mongo_read_preference = os.getenv("MONGO_READ_PREFERENCE", "primary")
+mongo_write_concern = os.getenv("MONGO_W")
+mongo_journal = os.getenv("MONGO_JOURNAL")
+
+# Повтори операцій після тимчасових мережевих помилок: кількість спроб і початкова затримка в секундах
+mongo_retry_attempts = int(os.getenv("MONGO_RETRY_ATTEMPTS", "3"))
+mongo_retry_backoff = float(os.getenv("MONGO_RETRY_BACKOFF", "0.1"))
+
+# Розмір пакета для пакетних операцій та їхній write concern ("1", "majority", "0");
+# без MONGO_BULK_W діє write concern колекції
+bulk_batch_size = int(os.getenv("MONGO_BULK_BATCH_SIZE", "1000"))
+bulk_write_concern = os.getenv("MONGO_BULK_W")
+
+# Унікальний індекс за ім'ям забороняє котів з однаковими іменами, тому вмикається явно;
+# складений індекс age/name обслуговує вибірку за віком, відсортовану за ім'ям
+unique_names = os.getenv("MONGO_UNIQUE_NAMES", "0") == "1"
+age_name_index = os.getenv("MONGO_AGE_NAME_INDEX", "1") == "1"
+
+# Порядок котів у вибірці за віком, що збігається зі складеним індексом
+AGE_SORT = [("age", ASCENDING), ("name", ASCENDING)]
+
+# Кількість документів, яку сервер повертає за один запит курсора
+read_batch_size = int(os.getenv("MONGO_READ_BATCH_SIZE", "1000"))
+
+# Лічильники результату пакетних оновлень: атрибут BulkWriteResult і ключ деталей BulkWriteError
+UPDATE_COUNTERS = {"matched": ("matched_count", "nMatched"), "modified": ("modified_count", "nModified")}
+
+
+def client_options():
+    """
+    Повертає параметри MongoClient з налаштувань; незадані параметри бере з URI або значень за замовчуванням.
+    """
+    options = {
+        "maxPoolSize": mongo_max_pool_size,
+        "minPoolSize": mongo_min_pool_size,
+        "serverSelectionTimeoutMS": mongo_server_selection_timeout_ms,
+        "connectTimeoutMS": mongo_connect_timeout_ms,
+        "readPreference": mongo_read_preference,
+    }
+    if mongo_max_idle_time_ms:
+        options["maxIdleTimeMS"] = int(mongo_max_idle_time_ms)
+    if mongo_socket_timeout_ms:
+        options["socketTimeoutMS"] = int(mongo_socket_timeout_ms)
+    if mongo_compressors:
+        options["compressors"] = mongo_compressors
+    if mongo_write_concern:
+        options["w"] = int(mongo_write_concern) if mongo_write_concern.isdigit() else mongo_write_concern
+    if mongo_journal:
+        options["journal"] = mongo_journal == "1"
+    return options
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Повертає спільний для процесу MongoClient, створюючи його під час першого виклику.
+
+    MongoClient не можна використовувати після fork, тому дочірній процес отримує власний клієнт.
+    """
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = MongoClient(mongo_uri, **client_options())
+            _client_pid = os.getpid()
+        return _client
 
-# Підключення до локальної бази даних MongoDB
-try:
-    client = MongoClient("mongodb://localhost:27017/", serverSelectionTimeoutMS=5000)
-    db = client.cats_db
-    client.server_info()  # Перевірка підключення до сервера
-except errors.ServerSelectionTimeoutError as err:
-    print(f"Не вдалося підключитися до MongoDB: {err}")
-    exit(1)
+
+def close_client():
+    """
+    Закриває спільний клієнт, якщо його створено в цьому процесі.
+    """
+    global _client
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+
+
+def get_db():
+    """
+    Повертає базу даних котів.
+    """
+    return get_client()[mongo_db]
+
+
+def get_cats_collection(w=None):
+    """
+    Повертає колекцію котів, за потреби із заданим write concern.
+
+    :param w: Кількість вузлів або "majority"; None залишає write concern клієнта
+    """
+    cats = get_db().cats
+    if w is None:
+        return cats
+    w = int(w) if str(w).isdigit() else w
+    return cats.with_options(write_concern=WriteConcern(w=w))
+
+
+def retry_transient(func):
+    """
+    Декоратор, що повторює операцію після тимчасових мережевих помилок (AutoReconnect,
+    зокрема недоступність сервера) з експоненційною затримкою.
+
+    Застосовується лише до операцій, повтор яких не змінює результату.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(mongo_retry_attempts):
+            try:
+                return func(*args, **kwargs)
+            except errors.AutoReconnect:
+                if attempt == mongo_retry_attempts - 1:
+                    raise
+                time.sleep(mongo_retry_backoff * 2**attempt * random.uniform(0.5, 1.5))
+
+    return wrapper
 
 
 def handle_mongo_error(prefix):
@@ -31,6 +163,183 @@ def handle_mongo_error(prefix):
     return decorator
 
 
+def name_filter(name):
+    """
+    Фільтр пошуку кота за ім'ям, який обслуговує індекс name_1.
+
+    :param name: Ім'я кота
+    """
+    return {"name": name}
+
+
+def feature_filter(feature):
+    """
+    Фільтр котів із заданою характеристикою, який обслуговує багатоключовий індекс features_1.
+
+    :param feature: Характеристика
+    """
+    return {"features": feature}
+
+
+def age_filter(min_age, max_age):
+    """
+    Фільтр котів, вік яких лежить у межах [min_age, max_age], для індексу age_1_name_1.
+
+    :param min_age: Мінімальний вік
+    :param max_age: Максимальний вік
+    """
+    return {"age": {"$gte": min_age, "$lte": max_age}}
+
+
+def cat_indexes():
+    """
+    Повертає індекси колекції котів відповідно до налаштувань.
+    """
+    indexes = [
+        IndexModel([("name", ASCENDING)], name="name_1", unique=unique_names),
+        IndexModel([("features", ASCENDING)], name="features_1"),
+    ]
+    if age_name_index:
+        indexes.append(IndexModel(AGE_SORT, name="age_1_name_1"))
+    return indexes
+
+
+def outdated_indexes(existing):
+    """
+    Повертає пари (індекс, чи треба спершу видалити наявний) для індексів, яких немає
+    або які мають інші ключі чи унікальність.
+
+    :param existing: Результат index_information() колекції
+    """
+    outdated = []
+    for model in cat_indexes():
+        spec = model.document
+        current = existing.get(spec["name"])
+        if current is not None:
+            same_keys = current["key"] == list(spec["key"].items())
+            if same_keys and current.get("unique", False) == spec.get("unique", False):
+                continue
+        outdated.append((model, current is not None))
+    return outdated
+
+
+@retry_transient
+def ensure_indexes():
+    """
+    Створює індекси колекції котів, яких ще немає; повторний виклик нічого не змінює.
+
+    Індекс з тим самим ім'ям, але іншими ключами чи унікальністю перестворюється.
+    Повертає імена створених індексів.
+    """
+    cats = get_cats_collection()
+    created = []
+    for model, replace in outdated_indexes(cats.index_information()):
+        if replace:
+            cats.drop_index(model.document["name"])
+        cats.create_indexes([model])
+        created.append(model.document["name"])
+    return created
+
+
+def iter_cats(query=None, projection=None, sort=None, batch_size=None, limit=0):
+    """
+    Генератор котів: документи надходять пакетами по batch_size, тож у пам'яті лише один пакет.
+
+    :param query: Фільтр, наприклад feature_filter("рудий"); None — усі коти
+    :param projection: Поля, які повертати, наприклад {"_id": 0, "name": 1}
+    :param sort: Порядок, наприклад AGE_SORT
+    :param batch_size: Кількість документів в одній відповіді сервера
+    :param limit: Максимальна кількість котів; 0 — без обмеження
+    """
+    cursor = get_cats_collection().find(query or {}, projection, limit=limit)
+    if sort:
+        cursor = cursor.sort(sort)
+    with cursor.batch_size(batch_size or read_batch_size):
+        yield from cursor
+
+
+@retry_transient
+def find_page(query, projection, page_size):
+    """
+    Повертає одну сторінку котів у порядку _id; сторінка читається повністю, тож її можна повторити.
+
+    :param query: Фільтр разом з умовою на _id
+    :param projection: Поля, які повертати
+    :param page_size: Кількість котів на сторінці
+    """
+    return list(get_cats_collection().find(query, projection, sort=[("_id", ASCENDING)], limit=page_size))
+
+
+@retry_transient
+def open_cats(query=None, sort=None):
+    """
+    Запускає iter_cats і читає перший пакет, тож повторюється лише відкриття вибірки.
+
+    Повертає ітератор усіх котів; помилки після першого пакета не повторюються.
+
+    :param query: Фільтр; None — усі коти
+    :param sort: Порядок, наприклад AGE_SORT
+    """
+    cats = iter_cats(query, sort=sort)
+    first = next(cats, None)
+    return iter(()) if first is None else itertools.chain([first], cats)
+
+
+def iter_cat_pages(page_size=1000, query=None, projection=None, after=None):
+    """
+    Генератор сторінок котів у порядку _id; кожна сторінка — окремий запит "_id > останній _id".
+
+    На відміну від skip, вартість сторінки не залежить від її номера, а перервану
+    вибірку можна продовжити, передавши _id останнього отриманого кота в after.
+
+    :param page_size: Кількість котів на сторінці
+    :param query: Фільтр без умови на _id; None — усі коти
+    :param projection: Поля, які повертати; _id потрібен для наступної сторінки
+    :param after: _id (ObjectId або його рядок), після якого починати
+    """
+    if projection is not None and not projection.get("_id", 1):
+        raise ValueError("pagination by _id needs _id in the projection")
+    last_id = ObjectId(after) if isinstance(after, str) else after
+    while True:
+        page_query = dict(query or {})
+        if last_id is not None:
+            page_query["_id"] = {"$gt": last_id}
+        page = find_page(page_query, projection, page_size)
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        last_id = page[-1]["_id"]
+
+
+@retry_transient
+def count_cats(query=None, estimate=True):
+    """
+    Повертає кількість котів.
+
+    Без фільтра за замовчуванням береться оцінка з метаданих колекції, яка не читає
+    документи; з фільтром виконується count_documents, який може використати індекс.
+
+    :param query: Фільтр; None — усі коти
+    :param estimate: Дозволити оцінку для всієї колекції
+    """
+    cats = get_cats_collection()
+    if not query and estimate:
+        return cats.estimated_document_count()
+    return cats.count_documents(query or {})
+
+
+def find_cat(name, projection=None):
+    """
+    Повертає кота за ім'ям або None.
+
+    :param name: Ім'я кота
+    :param projection: Поля, які повертати
+    """
+    return get_cats_collection().find_one(name_filter(name), projection)
+
+
 @handle_mongo_error("Помилка при створенні кота")
 def create_cat(name, age, features):
     """
@@ -41,41 +350,92 @@ def create_cat(name, age, features):
     :param features: Список характеристик кота
     """
     cat = {"name": name, "age": age, "features": features}
-    result = db.cats.insert_one(cat)
+    result = get_cats_collection().insert_one(cat)
     print(f"Додано кота з id: {result.inserted_id}")
 
 
+def print_cat_pages(query=None):
+    """
+    Виводить котів посторінково в порядку _id.
+
+    Кожна сторінка повторюється окремо після тимчасової помилки і продовжує з _id
+    останнього виведеного кота, тому повтор не виводить котів удруге.
+
+    :param query: Фільтр; None — усі коти
+    """
+    for page in iter_cat_pages(read_batch_size, query):
+        for cat in page:
+            print(cat)
+
+
 @handle_mongo_error("Помилка при читанні котів")
 def read_all_cats():
     """
     Виводить усі записи з колекції. Якщо колекція порожня, виводить відповідне повідомлення.
     """
-    count = db.cats.count_documents({})
+    count = count_cats()
     if count == 0:
         print("Котів не знайдено")
         return
 
-    cats = db.cats.find()
     print(f"Знайдено {count} котів:")
-    for cat in cats:
-        print(cat)
+    print_cat_pages()
 
 
 @handle_mongo_error("Помилка при пошуку кота за ім'ям")
+@retry_transient
 def read_cat_by_name(name):
     """
     Шукає кота за ім'ям та виводить його інформацію. Якщо кота не знайдено, виводить відповідне повідомлення.
 
     :param name: Ім'я кота
     """
-    cat = db.cats.find_one({"name": name})
+    cat = find_cat(name)
     if cat:
         print(cat)
     else:
         print(f'Кота з ім\'ям "{name}" не знайдено')
 
 
+@handle_mongo_error("Помилка при пошуку котів за характеристикою")
+def read_cats_by_feature(feature):
+    """
+    Виводить котів, що мають задану характеристику.
+
+    :param feature: Характеристика
+    """
+    count = count_cats(feature_filter(feature))
+    if count == 0:
+        print(f'Котів з характеристикою "{feature}" не знайдено')
+        return
+
+    print(f'Знайдено {count} котів з характеристикою "{feature}":')
+    print_cat_pages(feature_filter(feature))
+
+
+@handle_mongo_error("Помилка при пошуку котів за віком")
+def read_cats_by_age(min_age, max_age):
+    """
+    Виводить котів, вік яких лежить у межах [min_age, max_age], за віком та ім'ям.
+
+    Повторюються лише підрахунок і перший пакет: після початку виводу помилка
+    не повторює вибірку, щоб не вивести котів удруге.
+
+    :param min_age: Мінімальний вік
+    :param max_age: Максимальний вік
+    """
+    count = count_cats(age_filter(min_age, max_age))
+    if count == 0:
+        print(f"Котів віком від {min_age} до {max_age} не знайдено")
+        return
+
+    print(f"Знайдено {count} котів віком від {min_age} до {max_age}:")
+    for cat in open_cats(age_filter(min_age, max_age), sort=AGE_SORT):
+        print(cat)
+
+
 @handle_mongo_error("Помилка при оновленні віку кота")
+@retry_transient
 def update_cat_age(name, new_age):
     """
     Оновлює вік кота за його ім'ям.
@@ -83,7 +443,7 @@ def update_cat_age(name, new_age):
     :param name: Ім'я кота
     :param new_age: Новий вік кота
     """
-    result = db.cats.update_one({"name": name}, {"$set": {"age": new_age}})
+    result = get_cats_collection().update_one(name_filter(name), {"$set": {"age": new_age}})
     if result.matched_count:
         print(f'Оновлено вік кота з ім\'ям "{name}" до {new_age}')
     else:
@@ -98,7 +458,7 @@ def add_feature_to_cat(name, new_feature):
     :param name: Ім'я кота
     :param new_feature: Нова характеристика
     """
-    result = db.cats.update_one({"name": name}, {"$push": {"features": new_feature}})
+    result = get_cats_collection().update_one(name_filter(name), {"$push": {"features": new_feature}})
     if result.matched_count:
         print(f'Додано характеристику "{new_feature}" для кота з ім\'ям "{name}"')
     else:
@@ -112,7 +472,7 @@ def delete_cat_by_name(name):
 
     :param name: Ім'я кота
     """
-    result = db.cats.delete_one({"name": name})
+    result = get_cats_collection().delete_one(name_filter(name))
     if result.deleted_count:
         print(f'Видалено кота з ім\'ям "{name}"')
     else:
@@ -120,18 +480,158 @@ def delete_cat_by_name(name):
 
 
 @handle_mongo_error("Помилка при видаленні всіх котів")
+@retry_transient
 def delete_all_cats():
     """
     Видаляє всі записи з колекції котів.
     """
-    result = db.cats.delete_many({})
+    result = get_cats_collection().delete_many({})
     print(f"Видалено {result.deleted_count} котів")
 
 
+def _batches(items, batch_size):
+    """
+    Розбиває будь-який ітерований об'єкт на списки по batch_size елементів, не читаючи його наперед.
+
+    :param items: Ітерований об'єкт, зокрема генератор
+    :param batch_size: Розмір пакета
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    items = iter(items)
+    while batch := list(itertools.islice(items, batch_size)):
+        yield batch
+
+
+def _write_errors(err, offset):
+    """
+    Перетворює помилки BulkWriteError на записи з номером документа в усьому вхідному потоці.
+
+    :param err: Виняток BulkWriteError
+    :param offset: Номер першого документа пакета
+    """
+    result = []
+    for write_error in err.details.get("writeErrors", []):
+        op = write_error.get("op") or {}
+        result.append({
+            "index": offset + write_error["index"],
+            "name": op.get("name", op.get("q", {}).get("name")),
+            "code": write_error.get("code"),
+            "message": write_error.get("errmsg"),
+        })
+    return result
+
+
+def _bulk_write(requests, counters, batch_size, w):
+    """
+    Виконує операції невпорядкованими пакетами bulk_write і підсумовує результати.
+
+    Помилки окремих операцій не зупиняють решту пакета і потрапляють до "errors";
+    інші помилки PyMongo (наприклад, мережеві) переривають виконання винятком.
+
+    :param requests: Ітерований об'єкт операцій UpdateOne або DeleteOne
+    :param counters: Ключі результату з парами (атрибут BulkWriteResult, ключ деталей BulkWriteError)
+    :param batch_size: Кількість операцій в одному запиті до сервера
+    :param w: Write concern пакетів
+    """
+    collection = get_cats_collection(w)
+    summary = {"sent": 0, **{key: 0 for key in counters}, "errors": []}
+    for batch in _batches(requests, batch_size):
+        try:
+            result = collection.bulk_write(batch, ordered=False)
+            # Без підтвердження запису (w=0) лічильники невідомі й лишаються нульовими
+            if result.acknowledged:
+                for key, (attribute, _) in counters.items():
+                    summary[key] += getattr(result, attribute)
+        except errors.BulkWriteError as err:
+            for key, (_, detail) in counters.items():
+                summary[key] += err.details.get(detail, 0)
+            summary["errors"].extend(_write_errors(err, summary["sent"]))
+        summary["sent"] += len(batch)
+    return summary
+
+
+def create_cats(cats, batch_size=None, w=bulk_write_concern):
+    """
+    Додає котів пакетами insert_many з ordered=False.
+
+    Приймає будь-який ітерований об'єкт, зокрема генератор на мільйони котів:
+    у пам'яті одночасно перебуває лише один пакет. Повертає словник із кількістю
+    надісланих ("sent") і доданих ("inserted") документів та списком помилок
+    окремих документів ("errors"); без підтвердження запису (w=0) "inserted"
+    дорівнює кількості надісланих.
+
+    :param cats: Ітерований об'єкт словників з полями name, age, features
+    :param batch_size: Кількість документів в одному запиті до сервера
+    :param w: Write concern пакетів
+    """
+    collection = get_cats_collection(w)
+    summary = {"sent": 0, "inserted": 0, "errors": []}
+    for batch in _batches(cats, batch_size or bulk_batch_size):
+        documents = [{"name": cat["name"], "age": cat["age"], "features": list(cat["features"])} for cat in batch]
+        try:
+            result = collection.insert_many(documents, ordered=False)
+            summary["inserted"] += len(result.inserted_ids)
+        except errors.BulkWriteError as err:
+            summary["inserted"] += err.details.get("nInserted", 0)
+            summary["errors"].extend(_write_errors(err, summary["sent"]))
+        summary["sent"] += len(batch)
+    return summary
+
+
+def update_cats_age(ages, batch_size=None, w=bulk_write_concern):
+    """
+    Оновлює вік багатьох котів пакетами bulk_write.
+
+    :param ages: Словник або ітерований об'єкт пар (ім'я, новий вік)
+    :param batch_size: Кількість операцій в одному запиті до сервера
+    :param w: Write concern пакетів
+    """
+    pairs = ages.items() if isinstance(ages, dict) else ages
+    requests = (UpdateOne(name_filter(name), {"$set": {"age": age}}) for name, age in pairs)
+    return _bulk_write(requests, UPDATE_COUNTERS, batch_size or bulk_batch_size, w)
+
+
+def add_features_to_cats(features, batch_size=None, w=bulk_write_concern):
+    """
+    Додає характеристики багатьом котам пакетами bulk_write.
+
+    :param features: Ітерований об'єкт пар (ім'я, нова характеристика)
+    :param batch_size: Кількість операцій в одному запиті до сервера
+    :param w: Write concern пакетів
+    """
+    requests = (UpdateOne(name_filter(name), {"$push": {"features": feature}}) for name, feature in features)
+    return _bulk_write(requests, UPDATE_COUNTERS, batch_size or bulk_batch_size, w)
+
+
+def delete_cats_by_name(names, batch_size=None, w=bulk_write_concern):
+    """
+    Видаляє котів за іменами пакетами bulk_write, по одному коту на ім'я.
+
+    :param names: Ітерований об'єкт імен
+    :param batch_size: Кількість операцій в одному запиті до сервера
+    :param w: Write concern пакетів
+    """
+    requests = (DeleteOne(name_filter(name)) for name in names)
+    return _bulk_write(requests, {"deleted": ("deleted_count", "nRemoved")}, batch_size or bulk_batch_size, w)
+
+
 def main():
     """
     Основна функція для демонстрації роботи CRUD операцій.
     """
+    # Перевірка підключення до сервера
+    try:
+        get_client().admin.command("ping")
+    except errors.ConnectionFailure as err:
+        print(f"Не вдалося підключитися до MongoDB: {err}")
+        exit(1)
+
+    # Індекси створюються до першого запиту; повторний запуск їх не змінює
+    created = ensure_indexes()
+    if created:
+        print(f"Створено індекси: {', '.join(created)}")
+
     # Створення нового кота
     create_cat("barsik", 3, ["ходить в капці", "дає себе гладити", "рудий"])
     create_cat("murzik", 2, ["любить спати", "грає з м'ячем", "сірий"])
@@ -147,6 +647,12 @@ def main():
     print("\nПошук кота за ім'ям:")
     read_cat_by_name("barsik")
 
+    # Пошук котів за характеристикою та віком
+    print("\nКоти з характеристикою \"сірий\":")
+    read_cats_by_feature("сірий")
+    print("\nКоти віком від 2 до 4 років:")
+    read_cats_by_age(2, 4)
+
     # Оновлення віку кота
     print("\nОновлення віку barsik:")
     update_cat_age("barsik", 4)